@@ -18,6 +18,7 @@
 from __future__ import annotations
 import enum
 import struct
+import sys
 from typing import List, Optional, Tuple, Union, cast, Dict
 
 from .company_ids import COMPANY_IDENTIFIERS
@@ -54,6 +55,14 @@ def bit_flags_to_strings(bits, bit_flag_names):
     return names
 
 
+if sys.version_info >= (3, 10):
+    bit_count = int.bit_count
+else:
+
+    def bit_count(value: int) -> int:
+        return bin(value).count('1')
+
+
 def name_or_number(dictionary: Dict[int, str], number: int, width: int = 2) -> str:
     name = dictionary.get(number)
     if name is not None:
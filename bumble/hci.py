@@ -16,14 +16,28 @@
 # Imports
 # -----------------------------------------------------------------------------
 from __future__ import annotations
-import collections
 import dataclasses
 import enum
 import functools
+import itertools
 import logging
+import operator
 import secrets
 import struct
-from typing import Any, Callable, Dict, Iterable, List, Optional, Type, Union, ClassVar
+import sys
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+    ClassVar,
+)
 
 from bumble import crypto
 from .colors import color
@@ -32,9 +46,9 @@ from .core import (
     AdvertisingData,
     DeviceClass,
     ProtocolError,
+    bit_count,
     bit_flags_to_strings,
     name_or_number,
-    padded_bytes,
 )
 
 
@@ -71,11 +85,23 @@ def map_null_terminated_utf8_string(utf8_bytes):
         terminator = utf8_bytes.find(0)
         if terminator < 0:
             terminator = len(utf8_bytes)
-        return utf8_bytes[0:terminator].decode('utf8')
+        # Decode from a view, to avoid copying the bytes before the terminator
+        return str(memoryview(utf8_bytes)[:terminator], 'utf8')
     except UnicodeDecodeError:
         return utf8_bytes
 
 
+@functools.lru_cache(maxsize=None)
+def int_flag_names(flag_class, value):
+    '''
+    Get the '|'-joined names of the members of an IntFlag class that are set in a
+    value. The result is cached, since flag fields only take a few distinct values.
+    '''
+    return '|'.join(
+        flag.name for flag in flag_class if value & flag.value and flag.name is not None
+    )
+
+
 def map_class_of_device(class_of_device):
     (
         service_classes,
@@ -1456,6 +1482,13 @@ class HCI_Constant:
         return HCI_LINK_TYPE_NAMES.get(link_key_type, f'0x{link_key_type:02X}')
 
 
+# Field specs shared by many commands and events
+ERROR_SPEC = {'size': 1, 'mapper': HCI_Constant.error_name}
+ROLE_SPEC = {'size': 1, 'mapper': HCI_Constant.role_name}
+LE_PHY_SPEC = {'size': 1, 'mapper': HCI_Constant.le_phy_name}
+CLASS_OF_DEVICE_SPEC = {'size': 3, 'mapper': map_class_of_device}
+
+
 # -----------------------------------------------------------------------------
 class HCI_Error(ProtocolError):
     def __init__(self, error_code):
@@ -1479,6 +1512,28 @@ class HCI_StatusError(ProtocolError):
 # -----------------------------------------------------------------------------
 # Generic HCI object
 # -----------------------------------------------------------------------------
+UINT8_STRUCT = struct.Struct('B')
+INT8_STRUCT = struct.Struct('b')
+UINT16_STRUCT = struct.Struct('<H')
+UINT16_BE_STRUCT = struct.Struct('>H')
+INT16_STRUCT = struct.Struct('<h')
+UINT32_STRUCT = struct.Struct('<I')
+UINT32_BE_STRUCT = struct.Struct('>I')
+UINT64_STRUCT = struct.Struct('<Q')
+LEGACY_ADVERTISING_DATA_STRUCT = struct.Struct('<B31s')
+
+# struct format codes for the fixed-size field types
+FIELD_TYPE_STRUCT_FORMATS: Dict[Any, str] = {1: 'B', -1: 'b', 2: 'H', -2: 'h', 4: 'I'}
+
+# Sizes of the custom field parsers that always consume the same number of bytes
+FIXED_SIZE_FIELD_PARSERS: Dict[Any, int] = {CodingFormat.parse_from_bytes: 5}
+
+
+@functools.lru_cache(maxsize=None)
+def compiled_struct(struct_format: str) -> struct.Struct:
+    return struct.Struct(struct_format)
+
+
 class HCI_Object:
     @staticmethod
     def init_from_fields(hci_object, fields, values):
@@ -1510,6 +1565,11 @@ class HCI_Object:
                 field_type = field_type['parser']
 
         # Parse the field
+        if callable(field_type):
+            # Custom parsers (addresses, coding formats, ...) are the most common
+            # non-integer field types, so dispatch them before the type comparisons
+            new_offset, field_value = field_type(data, offset)
+            return (field_value, new_offset - offset)
         if field_type == '*':
             # The rest of the bytes
             field_value = data[offset:]
@@ -1525,43 +1585,176 @@ class HCI_Object:
             return (data[offset], 1)
         if field_type == -1:
             # 8-bit signed
-            return (struct.unpack_from('b', data, offset)[0], 1)
+            return (INT8_STRUCT.unpack_from(data, offset)[0], 1)
         if field_type == 2:
             # 16-bit unsigned
-            return (struct.unpack_from('<H', data, offset)[0], 2)
+            return (UINT16_STRUCT.unpack_from(data, offset)[0], 2)
         if field_type == '>2':
             # 16-bit unsigned big-endian
-            return (struct.unpack_from('>H', data, offset)[0], 2)
+            return (UINT16_BE_STRUCT.unpack_from(data, offset)[0], 2)
         if field_type == -2:
             # 16-bit signed
-            return (struct.unpack_from('<h', data, offset)[0], 2)
+            return (INT16_STRUCT.unpack_from(data, offset)[0], 2)
         if field_type == 3:
             # 24-bit unsigned
-            padded = data[offset : offset + 3] + bytes([0])
-            return (struct.unpack('<I', padded)[0], 3)
+            return (
+                UINT16_STRUCT.unpack_from(data, offset)[0] | data[offset + 2] << 16,
+                3,
+            )
         if field_type == 4:
             # 32-bit unsigned
-            return (struct.unpack_from('<I', data, offset)[0], 4)
+            return (UINT32_STRUCT.unpack_from(data, offset)[0], 4)
         if field_type == '>4':
             # 32-bit unsigned big-endian
-            return (struct.unpack_from('>I', data, offset)[0], 4)
+            return (UINT32_BE_STRUCT.unpack_from(data, offset)[0], 4)
         if isinstance(field_type, int) and 4 < field_type <= 256:
             # Byte array (from 5 up to 256 bytes)
             return (data[offset : offset + field_type], field_type)
-        if callable(field_type):
-            new_offset, field_value = field_type(data, offset)
-            return (field_value, new_offset - offset)
 
         raise ValueError(f'unknown field type {field_type}')
 
+    @staticmethod
+    def array_struct(array_field) -> Optional[struct.Struct]:
+        '''
+        Get a Struct for the items of an array field, or None if the items don't have
+        a fixed layout.
+        '''
+        struct_format = '<'
+        for _, sub_field_type in array_field:
+            if isinstance(sub_field_type, dict):
+                sub_field_type = sub_field_type.get('size')
+            if isinstance(sub_field_type, int) and 4 < sub_field_type <= 256:
+                struct_format += f'{sub_field_type}s'
+            elif (code := FIELD_TYPE_STRUCT_FORMATS.get(sub_field_type)) is not None:
+                struct_format += code
+            else:
+                return None
+
+        return compiled_struct(struct_format)
+
+    @staticmethod
+    def fields_struct(fields) -> Optional[struct.Struct]:
+        '''
+        Get a Struct for a whole list of fields, or None if some of the fields are
+        arrays, have custom parsers/serializers, or don't have a fixed size.
+        '''
+        if not fields:
+            return None
+        struct_format = '<'
+        for field in fields:
+            if isinstance(field, list):
+                return None
+            if (code := HCI_Object.field_struct_format(field[1])) is None:
+                return None
+            struct_format += code
+
+        return compiled_struct(struct_format)
+
+    @staticmethod
+    def field_struct_format(field_type) -> Optional[str]:
+        '''
+        Get the struct format code of a field in a fields Struct, or None if the field
+        doesn't have a fixed size.
+        '''
+        if isinstance(field_type, dict):
+            if 'parser' in field_type or 'serializer' in field_type:
+                return None
+            field_type = field_type.get('size')
+        if isinstance(field_type, int) and 4 < field_type <= 256:
+            return f'{field_type}s'
+        if callable(field_type):
+            if size := FIXED_SIZE_FIELD_PARSERS.get(field_type):
+                # Packed as bytes, and decoded with the parser
+                return f'{size}s'
+            return None
+        return FIELD_TYPE_STRUCT_FORMATS.get(field_type)
+
+    @staticmethod
+    def field_names(fields) -> List[str]:
+        '''
+        Get the names of all the fields, with the array field names up-leveled.
+        '''
+        names = []
+        for field in fields:
+            if isinstance(field, list):
+                names.extend(sub_field_name for sub_field_name, _ in field)
+            else:
+                names.append(field[0])
+        return names
+
+    @staticmethod
+    def fields_parsers(fields) -> List[Tuple[int, int, Callable]]:
+        '''
+        Get the index, offset and parser of the fields of a fields Struct that are
+        decoded by their own parser.
+        '''
+        fields_parsers = []
+        struct_format = '<'
+        for index, (_, field_type) in enumerate(fields):
+            if callable(field_type):
+                fields_parsers.append(
+                    (index, struct.calcsize(struct_format), field_type)
+                )
+            struct_format += HCI_Object.field_struct_format(field_type) or ''
+        return fields_parsers
+
+    @staticmethod
+    def fields_getter(field_names) -> Callable[[Any], Tuple[Any, ...]]:
+        '''
+        Get a function that returns the values of the named fields of an object, as
+        a tuple.
+        '''
+        getter = operator.attrgetter(*field_names)
+        if len(field_names) == 1:
+            return lambda hci_object: (getter(hci_object),)
+        return getter
+
+    @staticmethod
+    def values_from_struct(
+        data, fields_struct, fields_parsers, offset: int = 0
+    ) -> Sequence[Any]:
+        values = fields_struct.unpack_from(data, offset)
+        if not fields_parsers:
+            # Only plain integer and bytes fields
+            return values
+        parsed_values = list(values)
+        for index, field_offset, parser in fields_parsers:
+            # Parse from the original data, as some parsers look at the previous field
+            parsed_values[index] = parser(data, offset + field_offset)[1]
+        return parsed_values
+
+    @staticmethod
+    def values_to_struct_bytes(
+        values, fields_struct, fields_parsers
+    ) -> Optional[bytes]:
+        '''
+        Pack a list of field values with a fields Struct, or return None if some of
+        the values can't be packed as is.
+        '''
+        try:
+            for index, _, _ in fields_parsers:
+                values[index] = bytes(values[index])
+            return fields_struct.pack(*values)
+        except (struct.error, TypeError):
+            # Let the generic serializer deal with non-bytes values
+            return None
+
     @staticmethod
     def dict_from_bytes(data, offset, fields):
-        result = collections.OrderedDict()
+        result: Dict[str, Any] = {}
         for field in fields:
             if isinstance(field, list):
                 # This is an array field, starting with a 1-byte item count.
                 item_count = data[offset]
                 offset += 1
+                if item_count and (array_struct := HCI_Object.array_struct(field)):
+                    # All the items have the same fixed layout, parse them in one pass
+                    end = offset + item_count * array_struct.size
+                    items = array_struct.iter_unpack(memoryview(data)[offset:end])
+                    for (sub_field_name, _), values in zip(field, zip(*items)):
+                        result[sub_field_name] = list(values)
+                    offset = end
+                    continue
                 for _ in range(item_count):
                     for sub_field_name, sub_field_type in field:
                         value, size = HCI_Object.parse_field(
@@ -1594,32 +1787,34 @@ class HCI_Object:
             field_bytes = serializer(field_value)
         elif field_type == 1:
             # 8-bit unsigned
-            field_bytes = bytes([field_value])
+            if not 0 <= field_value <= 255:
+                raise ValueError(f'value {field_value} out of range for 8-bit field')
+            field_bytes = UINT8_STRUCT.pack(field_value)
         elif field_type == -1:
             # 8-bit signed
-            field_bytes = struct.pack('b', field_value)
+            field_bytes = INT8_STRUCT.pack(field_value)
         elif field_type == 2:
             # 16-bit unsigned
-            field_bytes = struct.pack('<H', field_value)
+            field_bytes = UINT16_STRUCT.pack(field_value)
         elif field_type == '>2':
             # 16-bit unsigned big-endian
-            field_bytes = struct.pack('>H', field_value)
+            field_bytes = UINT16_BE_STRUCT.pack(field_value)
         elif field_type == -2:
             # 16-bit signed
-            field_bytes = struct.pack('<h', field_value)
+            field_bytes = INT16_STRUCT.pack(field_value)
         elif field_type == 3:
             # 24-bit unsigned
-            field_bytes = struct.pack('<I', field_value)[0:3]
+            field_bytes = UINT32_STRUCT.pack(field_value)[0:3]
         elif field_type == 4:
             # 32-bit unsigned
-            field_bytes = struct.pack('<I', field_value)
+            field_bytes = UINT32_STRUCT.pack(field_value)
         elif field_type == '>4':
             # 32-bit unsigned big-endian
-            field_bytes = struct.pack('>I', field_value)
+            field_bytes = UINT32_BE_STRUCT.pack(field_value)
         elif field_type == '*':
             if isinstance(field_value, int):
                 if 0 <= field_value <= 255:
-                    field_bytes = bytes([field_value])
+                    field_bytes = UINT8_STRUCT.pack(field_value)
                 else:
                     raise ValueError('value too large for *-typed field')
             else:
@@ -1628,7 +1823,9 @@ class HCI_Object:
             # Variable-length bytes field, with 1-byte length at the beginning
             field_bytes = bytes(field_value)
             field_length = len(field_bytes)
-            field_bytes = bytes([field_length]) + field_bytes
+            if field_length > 255:
+                raise ValueError(f'value too long ({field_length}) for v-typed field')
+            field_bytes = b'%c%s' % (field_length, field_bytes)
         elif isinstance(field_value, (bytes, bytearray)) or hasattr(
             field_value, 'to_bytes'
         ):
@@ -1653,15 +1850,12 @@ class HCI_Object:
                 # item count. We use the length of the first array field as the
                 # array count, since all array fields have the same number of items.
                 item_count = len(hci_object[field[0][0]])
-                result += bytes([item_count]) + b''.join(
-                    b''.join(
-                        HCI_Object.serialize_field(
+                result.append(item_count)
+                for i in range(item_count):
+                    for sub_field_name, sub_field_type in field:
+                        result += HCI_Object.serialize_field(
                             hci_object[sub_field_name][i], sub_field_type
                         )
-                        for sub_field_name, sub_field_type in field
-                    )
-                    for i in range(item_count)
-                )
                 continue
 
             (field_name, field_type) = field
@@ -1683,11 +1877,21 @@ class HCI_Object:
 
     @staticmethod
     def serialize_length_prefixed_bytes(data, padded_size=0):
-        prefixed_size = 1 + len(data)
-        padding = (
-            bytes(padded_size - prefixed_size) if prefixed_size < padded_size else b''
-        )
-        return bytes([len(data)]) + data + padding
+        data_size = len(data)
+        buffer = bytearray(max(1 + data_size, padded_size))
+        buffer[0] = data_size
+        buffer[1 : 1 + data_size] = data
+        return bytes(buffer)
+
+    @staticmethod
+    def serialize_legacy_advertising_data(data):
+        '''
+        Serialize legacy advertising or scan response data, which is length-prefixed
+        and zero-padded to 32 bytes.
+        '''
+        if isinstance(data, (bytes, bytearray)) and len(data) <= 31:
+            return LEGACY_ADVERTISING_DATA_STRUCT.pack(len(data), data)
+        return HCI_Object.serialize_length_prefixed_bytes(data, padded_size=32)
 
     @staticmethod
     def format_field_value(value, indentation):
@@ -1761,13 +1965,20 @@ class HCI_Object:
 
         # Measure the widest field name
         max_field_name_length = max(len(s[0]) for s in field_strings)
-        sep = ':'
         return '\n'.join(
             f'{indentation}'
-            f'{color(f"{field_name + sep:{1 + max_field_name_length}}", "cyan")} {field_value}'
+            f'{HCI_Object.format_field_name(field_name, max_field_name_length)} '
+            f'{field_value}'
             for field_name, field_value in field_strings
         )
 
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def format_field_name(field_name, max_field_name_length):
+        # Field names and widths only depend on the static field definitions, so the
+        # padded and colored labels are cached instead of being rebuilt on each call.
+        return color(f'{field_name + ":":{1 + max_field_name_length}}', 'cyan')
+
     def __bytes__(self):
         return self.to_bytes()
 
@@ -1794,6 +2005,14 @@ class Address:
     address[0] is the LSB of the address, address[5] is the MSB.
     '''
 
+    __slots__ = ('address_bytes', 'address_type', '_flags', '_hash')
+
+    # Bits of the precomputed `_flags` value
+    _PUBLIC_FLAG = 1 << 0
+    _RESOLVED_FLAG = 1 << 1
+    _RESOLVABLE_FLAG = 1 << 2
+    _STATIC_FLAG = 1 << 3
+
     PUBLIC_DEVICE_ADDRESS = 0x00
     RANDOM_DEVICE_ADDRESS = 0x01
     PUBLIC_IDENTITY_ADDRESS = 0x02
@@ -1830,18 +2049,37 @@ class Address:
     def parse_address(data, offset):
         # Fix the type to a default value. This is used for parsing type-less Classic
         # addresses
-        return Address.parse_address_with_type(
-            data, offset, Address.PUBLIC_DEVICE_ADDRESS
+        return offset + 6, Address.interned(
+            bytes(data[offset : offset + 6]), Address.PUBLIC_DEVICE_ADDRESS
         )
 
     @staticmethod
     def parse_address_with_type(data, offset, address_type):
-        return offset + 6, Address(data[offset : offset + 6], address_type)
+        # The data may be a memoryview, so the address bytes are always materialized
+        return offset + 6, Address.interned(
+            bytes(data[offset : offset + 6]), address_type
+        )
+
+    @staticmethod
+    def parse_random_address(data, offset):
+        return offset + 6, Address.interned(
+            bytes(data[offset : offset + 6]), Address.RANDOM_DEVICE_ADDRESS
+        )
 
     @staticmethod
     def parse_address_preceded_by_type(data, offset):
-        address_type = data[offset - 1]
-        return Address.parse_address_with_type(data, offset, address_type)
+        return offset + 6, Address.interned(
+            bytes(data[offset : offset + 6]), data[offset - 1]
+        )
+
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def interned(address_bytes: bytes, address_type: int) -> Address:
+        '''
+        Get a shared instance for an address. Since addresses are immutable, the same
+        instance can be returned when the same peer address is parsed repeatedly.
+        '''
+        return Address(address_bytes, address_type)
 
     @classmethod
     def generate_static_address(cls) -> Address:
@@ -1849,10 +2087,10 @@ class Address:
 
         See Bluetooth spec, Vol 6, Part B - Table 1.2.
         '''
-        address_bytes = secrets.token_bytes(6)
-        address_bytes = address_bytes[:5] + bytes([address_bytes[5] | 0b11000000])
+        address_bytes = bytearray(secrets.token_bytes(6))
+        address_bytes[5] |= 0b11000000
         return Address(
-            address=address_bytes, address_type=Address.RANDOM_DEVICE_ADDRESS
+            address=bytes(address_bytes), address_type=Address.RANDOM_DEVICE_ADDRESS
         )
 
     @classmethod
@@ -1873,8 +2111,9 @@ class Address:
             prand = crypto.generate_prand()
             address_bytes = crypto.ah(irk, prand) + prand
         else:
-            address_bytes = secrets.token_bytes(6)
-            address_bytes = address_bytes[:5] + bytes([address_bytes[5] & 0b00111111])
+            random_bytes = bytearray(secrets.token_bytes(6))
+            random_bytes[5] &= 0b00111111
+            address_bytes = bytes(random_bytes)
 
         return Address(
             address=address_bytes, address_type=Address.RANDOM_DEVICE_ADDRESS
@@ -1908,36 +2147,50 @@ class Address:
 
         self.address_type = address_type
 
+        # Precompute the address properties, since they can't change
+        flags = 0
+        if address_type in (
+            Address.PUBLIC_DEVICE_ADDRESS,
+            Address.PUBLIC_IDENTITY_ADDRESS,
+        ):
+            flags |= Address._PUBLIC_FLAG
+        elif self.address_bytes[5] >> 6 == 3:
+            flags |= Address._STATIC_FLAG
+        if address_type in (
+            Address.PUBLIC_IDENTITY_ADDRESS,
+            Address.RANDOM_IDENTITY_ADDRESS,
+        ):
+            flags |= Address._RESOLVED_FLAG
+        elif (
+            address_type == Address.RANDOM_DEVICE_ADDRESS
+            and self.address_bytes[5] >> 6 == 1
+        ):
+            flags |= Address._RESOLVABLE_FLAG
+        self._flags = flags
+        self._hash: Optional[int] = None
+
     def clone(self):
         return Address(self.address_bytes, self.address_type)
 
     @property
     def is_public(self):
-        return self.address_type in (
-            self.PUBLIC_DEVICE_ADDRESS,
-            self.PUBLIC_IDENTITY_ADDRESS,
-        )
+        return bool(self._flags & Address._PUBLIC_FLAG)
 
     @property
     def is_random(self):
-        return not self.is_public
+        return not self._flags & Address._PUBLIC_FLAG
 
     @property
     def is_resolved(self):
-        return self.address_type in (
-            self.PUBLIC_IDENTITY_ADDRESS,
-            self.RANDOM_IDENTITY_ADDRESS,
-        )
+        return bool(self._flags & Address._RESOLVED_FLAG)
 
     @property
     def is_resolvable(self):
-        return self.address_type == self.RANDOM_DEVICE_ADDRESS and (
-            self.address_bytes[5] >> 6 == 1
-        )
+        return bool(self._flags & Address._RESOLVABLE_FLAG)
 
     @property
     def is_static(self):
-        return self.is_random and (self.address_bytes[5] >> 6 == 3)
+        return bool(self._flags & Address._STATIC_FLAG)
 
     def to_bytes(self):
         return self.address_bytes
@@ -1947,7 +2200,7 @@ class Address:
         String representation of the address, MSB first, with an optional type
         qualifier.
         '''
-        result = ':'.join([f'{x:02X}' for x in reversed(self.address_bytes)])
+        result = self.address_bytes[::-1].hex(':').upper()
         if not with_type_qualifier or not self.is_public:
             return result
         return result + '/P'
@@ -1956,7 +2209,9 @@ class Address:
         return self.to_bytes()
 
     def __hash__(self):
-        return hash(self.address_bytes)
+        if (address_hash := self._hash) is None:
+            address_hash = self._hash = hash(self.address_bytes)
+        return address_hash
 
     def __eq__(self, other):
         return (
@@ -1973,6 +2228,10 @@ Address.NIL = Address(b"\xff\xff\xff\xff\xff\xff", Address.PUBLIC_DEVICE_ADDRESS
 Address.ANY = Address(b"\x00\x00\x00\x00\x00\x00", Address.PUBLIC_DEVICE_ADDRESS)
 Address.ANY_RANDOM = Address(b"\x00\x00\x00\x00\x00\x00", Address.RANDOM_DEVICE_ADDRESS)
 
+FIXED_SIZE_FIELD_PARSERS[Address.parse_address] = 6
+FIXED_SIZE_FIELD_PARSERS[Address.parse_address_preceded_by_type] = 6
+FIXED_SIZE_FIELD_PARSERS[Address.parse_random_address] = 6
+
 
 # -----------------------------------------------------------------------------
 class OwnAddressType(enum.IntEnum):
@@ -1982,8 +2241,10 @@ class OwnAddressType(enum.IntEnum):
     RESOLVABLE_OR_RANDOM = 3
 
     @classmethod
+    @functools.lru_cache(maxsize=None)
     def type_spec(cls):
-        return {'size': 1, 'mapper': lambda x: OwnAddressType(x).name}
+        names = {member.value: member.name for member in cls}
+        return {'size': 1, 'mapper': lambda x: name_or_number(names, x)}
 
 
 # -----------------------------------------------------------------------------
@@ -1993,8 +2254,22 @@ class LoopbackMode(enum.IntEnum):
     REMOTE = 2
 
     @classmethod
+    @functools.lru_cache(maxsize=None)
     def type_spec(cls):
-        return {'size': 1, 'mapper': lambda x: LoopbackMode(x).name}
+        names = {member.value: member.name for member in cls}
+        return {'size': 1, 'mapper': lambda x: name_or_number(names, x)}
+
+
+# -----------------------------------------------------------------------------
+# Return parameters shared by many commands
+STATUS_AND_BD_ADDR_FIELDS = (
+    ('status', STATUS_SPEC),
+    ('bd_addr', Address.parse_address),
+)
+STATUS_AND_CONNECTION_HANDLE_FIELDS = (
+    ('status', STATUS_SPEC),
+    ('connection_handle', 2),
+)
 
 
 # -----------------------------------------------------------------------------
@@ -2003,28 +2278,19 @@ class HCI_Packet:
     Abstract Base class for HCI packets
     '''
 
+    __slots__ = ('name',)
+
     hci_packet_type: ClassVar[int]
+    packet_classes: ClassVar[Dict[int, Type[HCI_Packet]]] = {}
 
     @staticmethod
     def from_bytes(packet: bytes) -> HCI_Packet:
-        packet_type = packet[0]
-
-        if packet_type == HCI_COMMAND_PACKET:
-            return HCI_Command.from_bytes(packet)
-
-        if packet_type == HCI_ACL_DATA_PACKET:
-            return HCI_AclDataPacket.from_bytes(packet)
-
-        if packet_type == HCI_SYNCHRONOUS_DATA_PACKET:
-            return HCI_SynchronousDataPacket.from_bytes(packet)
-
-        if packet_type == HCI_EVENT_PACKET:
-            return HCI_Event.from_bytes(packet)
-
-        if packet_type == HCI_ISO_DATA_PACKET:
-            return HCI_IsoDataPacket.from_bytes(packet)
+        cls = HCI_Packet.packet_classes.get(packet[0])
+        if cls is None:
+            # No class registered for this packet type
+            return HCI_CustomPacket(packet)
 
-        return HCI_CustomPacket(packet)
+        return cls.from_bytes(packet)
 
     def __init__(self, name):
         self.name = name
@@ -2048,6 +2314,9 @@ class HCI_CustomPacket(HCI_Packet):
 
 
 # -----------------------------------------------------------------------------
+HCI_COMMAND_HEADER_STRUCT = struct.Struct('<BHB')
+
+
 class HCI_Command(HCI_Packet):
     '''
     See Bluetooth spec @ Vol 2, Part E - 5.4.1 HCI Command Packet
@@ -2055,8 +2324,17 @@ class HCI_Command(HCI_Packet):
 
     hci_packet_type = HCI_COMMAND_PACKET
     command_names: Dict[int, str] = {}
+    command_op_codes: Dict[str, int] = {}
     command_classes: Dict[int, Type[HCI_Command]] = {}
+    field_names: List[str] = []
+    fields_struct: Optional[struct.Struct] = None
+    fields_parsers: Iterable[Tuple[int, int, Callable]] = ()
+    return_parameters_struct: Optional[struct.Struct] = None
+    return_parameters_field_names: List[str] = []
+    return_parameters_parsers: Iterable[Tuple[int, int, Callable]] = ()
+    empty_packet: Optional[bytes] = None
     op_code: int
+    parameters: Optional[bytes] = None
 
     @staticmethod
     def command(fields=(), return_parameters_fields=()):
@@ -2066,14 +2344,42 @@ class HCI_Command(HCI_Packet):
 
         def inner(cls):
             cls.name = cls.__name__.upper()
-            cls.op_code = key_with_value(cls.command_names, cls.name)
+            cls.op_code = cls.command_op_codes.get(cls.name)
             if cls.op_code is None:
                 raise KeyError(f'command {cls.name} not found in command_names')
             cls.fields = fields
             cls.return_parameters_fields = return_parameters_fields
+            # Always set the layout attributes, so that a subclass never decodes
+            # with the fixed layout of its parent
+            cls.fields_struct = HCI_Object.fields_struct(fields)
+            cls.fields_parsers = (
+                HCI_Object.fields_parsers(fields) if cls.fields_struct else ()
+            )
+            cls.return_parameters_struct = HCI_Object.fields_struct(
+                return_parameters_fields
+            )
+            if cls.return_parameters_struct is not None:
+                cls.return_parameters_field_names = HCI_Object.field_names(
+                    return_parameters_fields
+                )
+                cls.return_parameters_parsers = HCI_Object.fields_parsers(
+                    return_parameters_fields
+                )
+            else:
+                cls.return_parameters_field_names = []
+                cls.return_parameters_parsers = ()
+
+            if fields is not None and not fields:
+                # Commands without parameters always serialize to the same packet
+                cls.empty_packet = HCI_COMMAND_HEADER_STRUCT.pack(
+                    HCI_COMMAND_PACKET, cls.op_code, 0
+                )
+            else:
+                cls.empty_packet = None
 
             # Patch the __init__ method to fix the op_code
             if fields is not None:
+                cls.field_names = HCI_Object.field_names(fields)
 
                 def init(self, parameters=None, **kwargs):
                     return HCI_Command.__init__(self, cls.op_code, parameters, **kwargs)
@@ -2097,11 +2403,16 @@ class HCI_Command(HCI_Packet):
 
     @classmethod
     def register_commands(cls, symbols: Dict[str, Any]) -> None:
-        cls.command_names.update(cls.command_map(symbols))
+        command_names = cls.command_map(symbols)
+        cls.command_names.update(command_names)
+        cls.command_op_codes.update(
+            (command_name, command_code)
+            for command_code, command_name in command_names.items()
+        )
 
     @staticmethod
     def from_bytes(packet: bytes) -> HCI_Command:
-        op_code, length = struct.unpack_from('<HB', packet, 1)
+        _, op_code, length = HCI_COMMAND_HEADER_STRUCT.unpack_from(packet)
         parameters = packet[4:]
         if len(parameters) != length:
             raise ValueError('invalid packet length')
@@ -2115,8 +2426,24 @@ class HCI_Command(HCI_Packet):
         # Create a new instance
         if (fields := getattr(cls, 'fields', None)) is not None:
             self = cls.__new__(cls)
-            HCI_Command.__init__(self, op_code, parameters)
-            HCI_Object.init_from_bytes(self, parameters, 0, fields)
+            fields_struct = cls.fields_struct
+            if fields_struct is not None and fields_struct.size == length:
+                # Fixed layout, all the fields can be unpacked in one call, and the
+                # registered class already knows its name and op_code
+                self.name = cls.name
+                self.op_code = op_code
+                self.parameters = parameters
+                self.__dict__.update(
+                    zip(
+                        cls.field_names,
+                        HCI_Object.values_from_struct(
+                            parameters, fields_struct, cls.fields_parsers
+                        ),
+                    )
+                )
+            else:
+                HCI_Command.__init__(self, op_code, parameters)
+                HCI_Object.init_from_bytes(self, parameters, 0, fields)
             return self
 
         return cls.from_parameters(parameters)  # type: ignore
@@ -2134,11 +2461,27 @@ class HCI_Command(HCI_Packet):
 
     @classmethod
     def parse_return_parameters(cls, parameters):
-        if not cls.return_parameters_fields:
+        if not (fields := cls.return_parameters_fields):
             return None
-        return_parameters = HCI_Object.from_bytes(
-            parameters, 0, cls.return_parameters_fields
-        )
+        return_parameters_struct = cls.return_parameters_struct
+        if (
+            return_parameters_struct is not None
+            and return_parameters_struct.size == len(parameters)
+        ):
+            # Fixed layout, all the fields can be unpacked in one call
+            return_parameters = HCI_Object.__new__(HCI_Object)
+            return_parameters.__dict__.update(
+                zip(
+                    cls.return_parameters_field_names,
+                    HCI_Object.values_from_struct(
+                        parameters,
+                        return_parameters_struct,
+                        cls.return_parameters_parsers,
+                    ),
+                )
+            )
+        else:
+            return_parameters = HCI_Object.from_bytes(parameters, 0, fields)
         return_parameters.fields = cls.return_parameters_fields
         return return_parameters
 
@@ -2149,18 +2492,46 @@ class HCI_Command(HCI_Packet):
         assert op_code != -1
         super().__init__(HCI_Command.command_name(op_code))
         if (fields := getattr(self, 'fields', None)) and kwargs:
-            HCI_Object.init_from_fields(self, fields, kwargs)
+            values = []
+            for field_name in self.field_names:
+                value = kwargs[field_name]
+                setattr(self, field_name, value)
+                values.append(value)
+            if parameters is None and (fields_struct := self.fields_struct):
+                parameters = HCI_Object.values_to_struct_bytes(
+                    values, fields_struct, self.fields_parsers
+                )
             if parameters is None:
                 parameters = HCI_Object.dict_to_bytes(kwargs, fields)
         self.op_code = op_code
-        self.parameters = parameters
+        if parameters is not None:
+            self.parameters = parameters
 
-    def to_bytes(self):
+    def serialized_size(self) -> int:
+        return HCI_COMMAND_HEADER_STRUCT.size + (
+            0 if self.parameters is None else len(self.parameters)
+        )
+
+    def serialize_into(self, buffer, offset: int = 0) -> int:
+        '''
+        Write the packet into a preallocated buffer at the given offset, and return
+        the offset right after it.
+        '''
         parameters = b'' if self.parameters is None else self.parameters
-        return (
-            struct.pack('<BHB', HCI_COMMAND_PACKET, self.op_code, len(parameters))
-            + parameters
+        HCI_COMMAND_HEADER_STRUCT.pack_into(
+            buffer, offset, HCI_COMMAND_PACKET, self.op_code, len(parameters)
         )
+        offset += HCI_COMMAND_HEADER_STRUCT.size
+        end = offset + len(parameters)
+        buffer[offset:end] = parameters
+        return end
+
+    def to_bytes(self):
+        if not self.parameters and self.empty_packet is not None:
+            return self.empty_packet
+        buffer = bytearray(self.serialized_size())
+        self.serialize_into(buffer)
+        return bytes(buffer)
 
     def __bytes__(self):
         return self.to_bytes()
@@ -2176,6 +2547,7 @@ class HCI_Command(HCI_Packet):
 
 
 HCI_Command.register_commands(globals())
+HCI_Packet.packet_classes[HCI_COMMAND_PACKET] = HCI_Command
 
 
 # -----------------------------------------------------------------------------
@@ -2221,7 +2593,7 @@ class HCI_Create_Connection_Command(HCI_Command):
 @HCI_Command.command(
     [
         ('connection_handle', 2),
-        ('reason', {'size': 1, 'mapper': HCI_Constant.error_name}),
+        ('reason', ERROR_SPEC),
     ]
 )
 class HCI_Disconnect_Command(HCI_Command):
@@ -2233,10 +2605,7 @@ class HCI_Disconnect_Command(HCI_Command):
 # -----------------------------------------------------------------------------
 @HCI_Command.command(
     fields=[('bd_addr', Address.parse_address)],
-    return_parameters_fields=[
-        ('status', STATUS_SPEC),
-        ('bd_addr', Address.parse_address),
-    ],
+    return_parameters_fields=STATUS_AND_BD_ADDR_FIELDS,
 )
 class HCI_Create_Connection_Cancel_Command(HCI_Command):
     '''
@@ -2256,7 +2625,7 @@ class HCI_Accept_Connection_Request_Command(HCI_Command):
 @HCI_Command.command(
     [
         ('bd_addr', Address.parse_address),
-        ('reason', {'size': 1, 'mapper': HCI_Constant.error_name}),
+        ('reason', ERROR_SPEC),
     ]
 )
 class HCI_Reject_Connection_Request_Command(HCI_Command):
@@ -2276,10 +2645,7 @@ class HCI_Link_Key_Request_Reply_Command(HCI_Command):
 # -----------------------------------------------------------------------------
 @HCI_Command.command(
     fields=[('bd_addr', Address.parse_address)],
-    return_parameters_fields=[
-        ('status', STATUS_SPEC),
-        ('bd_addr', Address.parse_address),
-    ],
+    return_parameters_fields=STATUS_AND_BD_ADDR_FIELDS,
 )
 class HCI_Link_Key_Request_Negative_Reply_Command(HCI_Command):
     '''
@@ -2294,10 +2660,7 @@ class HCI_Link_Key_Request_Negative_Reply_Command(HCI_Command):
         ('pin_code_length', 1),
         ('pin_code', 16),
     ],
-    return_parameters_fields=[
-        ('status', STATUS_SPEC),
-        ('bd_addr', Address.parse_address),
-    ],
+    return_parameters_fields=STATUS_AND_BD_ADDR_FIELDS,
 )
 class HCI_PIN_Code_Request_Reply_Command(HCI_Command):
     '''
@@ -2308,10 +2671,7 @@ class HCI_PIN_Code_Request_Reply_Command(HCI_Command):
 # -----------------------------------------------------------------------------
 @HCI_Command.command(
     fields=[('bd_addr', Address.parse_address)],
-    return_parameters_fields=[
-        ('status', STATUS_SPEC),
-        ('bd_addr', Address.parse_address),
-    ],
+    return_parameters_fields=STATUS_AND_BD_ADDR_FIELDS,
 )
 class HCI_PIN_Code_Request_Negative_Reply_Command(HCI_Command):
     '''
@@ -2398,7 +2758,7 @@ class HCI_Read_Clock_Offset_Command(HCI_Command):
 @HCI_Command.command(
     fields=[
         ('bd_addr', Address.parse_address),
-        ('reason', {'size': 1, 'mapper': HCI_Constant.error_name}),
+        ('reason', ERROR_SPEC),
     ],
 )
 class HCI_Reject_Synchronous_Connection_Request_Command(HCI_Command):
@@ -2418,10 +2778,7 @@ class HCI_Reject_Synchronous_Connection_Request_Command(HCI_Command):
             {'size': 1, 'mapper': HCI_Constant.authentication_requirements_name},
         ),
     ],
-    return_parameters_fields=[
-        ('status', STATUS_SPEC),
-        ('bd_addr', Address.parse_address),
-    ],
+    return_parameters_fields=STATUS_AND_BD_ADDR_FIELDS,
 )
 class HCI_IO_Capability_Request_Reply_Command(HCI_Command):
     '''
@@ -2432,10 +2789,7 @@ class HCI_IO_Capability_Request_Reply_Command(HCI_Command):
 # -----------------------------------------------------------------------------
 @HCI_Command.command(
     fields=[('bd_addr', Address.parse_address)],
-    return_parameters_fields=[
-        ('status', STATUS_SPEC),
-        ('bd_addr', Address.parse_address),
-    ],
+    return_parameters_fields=STATUS_AND_BD_ADDR_FIELDS,
 )
 class HCI_User_Confirmation_Request_Reply_Command(HCI_Command):
     '''
@@ -2446,10 +2800,7 @@ class HCI_User_Confirmation_Request_Reply_Command(HCI_Command):
 # -----------------------------------------------------------------------------
 @HCI_Command.command(
     fields=[('bd_addr', Address.parse_address)],
-    return_parameters_fields=[
-        ('status', STATUS_SPEC),
-        ('bd_addr', Address.parse_address),
-    ],
+    return_parameters_fields=STATUS_AND_BD_ADDR_FIELDS,
 )
 class HCI_User_Confirmation_Request_Negative_Reply_Command(HCI_Command):
     '''
@@ -2460,10 +2811,7 @@ class HCI_User_Confirmation_Request_Negative_Reply_Command(HCI_Command):
 # -----------------------------------------------------------------------------
 @HCI_Command.command(
     fields=[('bd_addr', Address.parse_address), ('numeric_value', 4)],
-    return_parameters_fields=[
-        ('status', STATUS_SPEC),
-        ('bd_addr', Address.parse_address),
-    ],
+    return_parameters_fields=STATUS_AND_BD_ADDR_FIELDS,
 )
 class HCI_User_Passkey_Request_Reply_Command(HCI_Command):
     '''
@@ -2474,10 +2822,7 @@ class HCI_User_Passkey_Request_Reply_Command(HCI_Command):
 # -----------------------------------------------------------------------------
 @HCI_Command.command(
     fields=[('bd_addr', Address.parse_address)],
-    return_parameters_fields=[
-        ('status', STATUS_SPEC),
-        ('bd_addr', Address.parse_address),
-    ],
+    return_parameters_fields=STATUS_AND_BD_ADDR_FIELDS,
 )
 class HCI_User_Passkey_Request_Negative_Reply_Command(HCI_Command):
     '''
@@ -2492,10 +2837,7 @@ class HCI_User_Passkey_Request_Negative_Reply_Command(HCI_Command):
         ('c', 16),
         ('r', 16),
     ],
-    return_parameters_fields=[
-        ('status', STATUS_SPEC),
-        ('bd_addr', Address.parse_address),
-    ],
+    return_parameters_fields=STATUS_AND_BD_ADDR_FIELDS,
 )
 class HCI_Remote_OOB_Data_Request_Reply_Command(HCI_Command):
     '''
@@ -2506,10 +2848,7 @@ class HCI_Remote_OOB_Data_Request_Reply_Command(HCI_Command):
 # -----------------------------------------------------------------------------
 @HCI_Command.command(
     fields=[('bd_addr', Address.parse_address)],
-    return_parameters_fields=[
-        ('status', STATUS_SPEC),
-        ('bd_addr', Address.parse_address),
-    ],
+    return_parameters_fields=STATUS_AND_BD_ADDR_FIELDS,
 )
 class HCI_Remote_OOB_Data_Request_Negative_Reply_Command(HCI_Command):
     '''
@@ -2523,10 +2862,7 @@ class HCI_Remote_OOB_Data_Request_Negative_Reply_Command(HCI_Command):
         ('bd_addr', Address.parse_address),
         ('reason', 1),
     ],
-    return_parameters_fields=[
-        ('status', STATUS_SPEC),
-        ('bd_addr', Address.parse_address),
-    ],
+    return_parameters_fields=STATUS_AND_BD_ADDR_FIELDS,
 )
 class HCI_IO_Capability_Request_Negative_Reply_Command(HCI_Command):
     '''
@@ -2632,6 +2968,14 @@ class HCI_Enhanced_Accept_Synchronous_Connection_Request_Command(HCI_Command):
     See Bluetooth spec @ 7.1.46 Enhanced Accept Synchronous Connection Request Command
     '''
 
+    # Same parameter values as for the Enhanced Setup Synchronous Connection Command
+    PcmDataFormat = HCI_Enhanced_Setup_Synchronous_Connection_Command.PcmDataFormat
+    DataPath = HCI_Enhanced_Setup_Synchronous_Connection_Command.DataPath
+    RetransmissionEffort = (
+        HCI_Enhanced_Setup_Synchronous_Connection_Command.RetransmissionEffort
+    )
+    PacketType = HCI_Enhanced_Setup_Synchronous_Connection_Command.PacketType
+
 
 # -----------------------------------------------------------------------------
 @HCI_Command.command(
@@ -2650,10 +2994,7 @@ class HCI_Truncated_Page_Command(HCI_Command):
 # -----------------------------------------------------------------------------
 @HCI_Command.command(
     fields=[('bd_addr', Address.parse_address)],
-    return_parameters_fields=[
-        ('status', STATUS_SPEC),
-        ('bd_addr', Address.parse_address),
-    ],
+    return_parameters_fields=STATUS_AND_BD_ADDR_FIELDS,
 )
 class HCI_Truncated_Page_Cancel_Command(HCI_Command):
     '''
@@ -2742,10 +3083,7 @@ class HCI_Receive_Synchronization_Train_Command(HCI_Command):
         ('c_256', 16),
         ('r_256', 16),
     ],
-    return_parameters_fields=[
-        ('status', STATUS_SPEC),
-        ('bd_addr', Address.parse_address),
-    ],
+    return_parameters_fields=STATUS_AND_BD_ADDR_FIELDS,
 )
 class HCI_Remote_OOB_Extended_Data_Request_Reply_Command(HCI_Command):
     '''
@@ -2781,7 +3119,7 @@ class HCI_Exit_Sniff_Mode_Command(HCI_Command):
 @HCI_Command.command(
     [
         ('bd_addr', Address.parse_address),
-        ('role', {'size': 1, 'mapper': HCI_Constant.role_name}),
+        ('role', ROLE_SPEC),
     ]
 )
 class HCI_Switch_Role_Command(HCI_Command):
@@ -2822,6 +3160,10 @@ class HCI_Sniff_Subrating_Command(HCI_Command):
 
 
 # -----------------------------------------------------------------------------
+# Bit values of the 64-bit event masks, indexed by bit number
+EVENT_MASK_BITS = tuple(1 << bit_number for bit_number in range(64))
+
+
 @HCI_Command.command([('event_mask', 8)])
 class HCI_Set_Event_Mask_Command(HCI_Command):
     '''
@@ -2838,9 +3180,12 @@ class HCI_Set_Event_Mask_Command(HCI_Command):
         # less than the event code.
         # If future versions of the specification deviate from that, a different
         # implementation would be needed.
-        return sum((1 << event_code - 1) for event_code in event_codes).to_bytes(
-            8, 'little'
-        )
+        mask = 0
+        for event_code in event_codes:
+            if not 1 <= event_code <= 64:
+                raise ValueError(f'event code {event_code} has no event mask bit')
+            mask |= EVENT_MASK_BITS[event_code - 1]
+        return UINT64_STRUCT.pack(mask)
 
 
 # -----------------------------------------------------------------------------
@@ -2971,7 +3316,7 @@ class HCI_Write_Inquiry_Scan_Activity_Command(HCI_Command):
 @HCI_Command.command(
     return_parameters_fields=[
         ('status', STATUS_SPEC),
-        ('class_of_device', {'size': 3, 'mapper': map_class_of_device}),
+        ('class_of_device', CLASS_OF_DEVICE_SPEC),
     ]
 )
 class HCI_Read_Class_Of_Device_Command(HCI_Command):
@@ -2981,7 +3326,7 @@ class HCI_Read_Class_Of_Device_Command(HCI_Command):
 
 
 # -----------------------------------------------------------------------------
-@HCI_Command.command([('class_of_device', {'size': 3, 'mapper': map_class_of_device})])
+@HCI_Command.command([('class_of_device', CLASS_OF_DEVICE_SPEC)])
 class HCI_Write_Class_Of_Device_Command(HCI_Command):
     '''
     See Bluetooth spec @ 7.3.26 Write Class of Device Command
@@ -3113,10 +3458,7 @@ class HCI_Write_Page_Scan_Type_Command(HCI_Command):
 @HCI_Command.command(
     [
         ('fec_required', 1),
-        (
-            'extended_inquiry_response',
-            {'size': 240, 'serializer': lambda x: padded_bytes(x, 240)},
-        ),
+        ('extended_inquiry_response', 240),
     ]
 )
 class HCI_Write_Extended_Inquiry_Response_Command(HCI_Command):
@@ -3295,24 +3637,39 @@ class HCI_Read_Buffer_Size_Command(HCI_Command):
     '''
 
 
+# -----------------------------------------------------------------------------
+@HCI_Command.command(return_parameters_fields=STATUS_AND_BD_ADDR_FIELDS)
+class HCI_Read_BD_ADDR_Command(HCI_Command):
+    '''
+    See Bluetooth spec @ 7.4.6 Read BD_ADDR Command
+    '''
+
+
 # -----------------------------------------------------------------------------
 @HCI_Command.command(
     return_parameters_fields=[
         ('status', STATUS_SPEC),
-        ('bd_addr', Address.parse_address),
+        [('standard_codec_ids', 1)],
+        [('vendor_specific_codec_ids', 4)],
     ]
 )
-class HCI_Read_BD_ADDR_Command(HCI_Command):
+class HCI_Read_Local_Supported_Codecs_Command(HCI_Command):
     '''
-    See Bluetooth spec @ 7.4.6 Read BD_ADDR Command
+    See Bluetooth spec @ 7.4.8 Read Local Supported Codecs Command
     '''
 
 
 # -----------------------------------------------------------------------------
-@HCI_Command.command()
-class HCI_Read_Local_Supported_Codecs_Command(HCI_Command):
+@HCI_Command.command(
+    return_parameters_fields=[
+        ('status', STATUS_SPEC),
+        [('standard_codec_ids', 1), ('standard_codec_transports', 1)],
+        [('vendor_specific_codec_ids', 4), ('vendor_specific_codec_transports', 1)],
+    ]
+)
+class HCI_Read_Local_Supported_Codecs_V2_Command(HCI_Command):
     '''
-    See Bluetooth spec @ 7.4.8 Read Local Supported Codecs Command
+    See Bluetooth spec @ 7.4.10 Read Local Supported Codecs Command [v2]
     '''
 
 
@@ -3380,9 +3737,12 @@ class HCI_LE_Set_Event_Mask_Command(HCI_Command):
         # less than the event code.
         # If future versions of the specification deviate from that, a different
         # implementation would be needed.
-        return sum((1 << event_code - 1) for event_code in event_codes).to_bytes(
-            8, 'little'
-        )
+        mask = 0
+        for event_code in event_codes:
+            if not 1 <= event_code <= 64:
+                raise ValueError(f'event code {event_code} has no event mask bit')
+            mask |= EVENT_MASK_BITS[event_code - 1]
+        return UINT64_STRUCT.pack(mask)
 
 
 # -----------------------------------------------------------------------------
@@ -3410,16 +3770,7 @@ class HCI_LE_Read_Local_Supported_Features_Command(HCI_Command):
 
 
 # -----------------------------------------------------------------------------
-@HCI_Command.command(
-    [
-        (
-            'random_address',
-            lambda data, offset: Address.parse_address_with_type(
-                data, offset, Address.RANDOM_DEVICE_ADDRESS
-            ),
-        )
-    ]
-)
+@HCI_Command.command([('random_address', Address.parse_random_address)])
 class HCI_LE_Set_Random_Address_Command(HCI_Command):
     '''
     See Bluetooth spec @ 7.8.4 LE Set Random Address Command
@@ -3487,9 +3838,7 @@ class HCI_LE_Read_Advertising_Physical_Channel_Tx_Power_Command(HCI_Command):
             'advertising_data',
             {
                 'parser': HCI_Object.parse_length_prefixed_bytes,
-                'serializer': functools.partial(
-                    HCI_Object.serialize_length_prefixed_bytes, padded_size=32
-                ),
+                'serializer': HCI_Object.serialize_legacy_advertising_data,
             },
         )
     ]
@@ -3507,9 +3856,7 @@ class HCI_LE_Set_Advertising_Data_Command(HCI_Command):
             'scan_response_data',
             {
                 'parser': HCI_Object.parse_length_prefixed_bytes,
-                'serializer': functools.partial(
-                    HCI_Object.serialize_length_prefixed_bytes, padded_size=32
-                ),
+                'serializer': HCI_Object.serialize_legacy_advertising_data,
             },
         )
     ]
@@ -3737,7 +4084,7 @@ class HCI_LE_Remote_Connection_Parameter_Request_Reply_Command(HCI_Command):
 @HCI_Command.command(
     [
         ('connection_handle', 2),
-        ('reason', {'size': 1, 'mapper': HCI_Constant.error_name}),
+        ('reason', ERROR_SPEC),
     ]
 )
 class HCI_LE_Remote_Connection_Parameter_Request_Negative_Reply_Command(HCI_Command):
@@ -3754,7 +4101,7 @@ class HCI_LE_Remote_Connection_Parameter_Request_Negative_Reply_Command(HCI_Comm
         ('tx_octets', 2),
         ('tx_time', 2),
     ],
-    return_parameters_fields=[('status', STATUS_SPEC), ('connection_handle', 2)],
+    return_parameters_fields=STATUS_AND_CONNECTION_HANDLE_FIELDS,
 )
 class HCI_LE_Set_Data_Length_Command(HCI_Command):
     '''
@@ -3845,8 +4192,8 @@ class HCI_LE_Read_Maximum_Data_Length_Command(HCI_Command):
     return_parameters_fields=[
         ('status', STATUS_SPEC),
         ('connection_handle', 2),
-        ('tx_phy', {'size': 1, 'mapper': HCI_Constant.le_phy_name}),
-        ('rx_phy', {'size': 1, 'mapper': HCI_Constant.le_phy_name}),
+        ('tx_phy', LE_PHY_SPEC),
+        ('rx_phy', LE_PHY_SPEC),
     ],
 )
 class HCI_LE_Read_PHY_Command(HCI_Command):
@@ -3939,12 +4286,7 @@ class HCI_LE_Set_PHY_Command(HCI_Command):
 @HCI_Command.command(
     [
         ('advertising_handle', 1),
-        (
-            'random_address',
-            lambda data, offset: Address.parse_address_with_type(
-                data, offset, Address.RANDOM_DEVICE_ADDRESS
-            ),
-        ),
+        ('random_address', Address.parse_random_address),
     ]
 )
 class HCI_LE_Set_Advertising_Set_Random_Address_Command(HCI_Command):
@@ -3985,9 +4327,9 @@ class HCI_LE_Set_Advertising_Set_Random_Address_Command(HCI_Command):
         ('peer_address', Address.parse_address_preceded_by_type),
         ('advertising_filter_policy', 1),
         ('advertising_tx_power', 1),
-        ('primary_advertising_phy', {'size': 1, 'mapper': HCI_Constant.le_phy_name}),
+        ('primary_advertising_phy', LE_PHY_SPEC),
         ('secondary_advertising_max_skip', 1),
-        ('secondary_advertising_phy', {'size': 1, 'mapper': HCI_Constant.le_phy_name}),
+        ('secondary_advertising_phy', LE_PHY_SPEC),
         ('advertising_sid', 1),
         ('scan_request_notification_enable', 1),
     ],
@@ -4011,11 +4353,7 @@ class HCI_LE_Set_Extended_Advertising_Parameters_Command(HCI_Command):
         INCLUDE_TX_POWER = 1 << 6
 
         def __str__(self) -> str:
-            return '|'.join(
-                flag.name
-                for flag in HCI_LE_Set_Extended_Advertising_Parameters_Command.AdvertisingProperties
-                if self.value & flag.value and flag.name is not None
-            )
+            return int_flag_names(type(self), self.value)
 
     class ChannelMap(enum.IntFlag):
         CHANNEL_37 = 1 << 0
@@ -4023,27 +4361,24 @@ class HCI_LE_Set_Extended_Advertising_Parameters_Command(HCI_Command):
         CHANNEL_39 = 1 << 2
 
         def __str__(self) -> str:
-            return '|'.join(
-                flag.name
-                for flag in HCI_LE_Set_Extended_Advertising_Parameters_Command.ChannelMap
-                if self.value & flag.value and flag.name is not None
-            )
+            return int_flag_names(type(self), self.value)
+
+
+# -----------------------------------------------------------------------------
+# Shared by the extended advertising and scan response data commands
+ADVERTISING_DATA_OPERATION_SPEC = {
+    'size': 1,
+    'mapper': lambda x: name_or_number(
+        HCI_LE_Set_Extended_Advertising_Data_Command.OPERATION_NAMES, x
+    ),
+}
 
 
 # -----------------------------------------------------------------------------
 @HCI_Command.command(
-    # pylint: disable=line-too-long,unnecessary-lambda
     [
         ('advertising_handle', 1),
-        (
-            'operation',
-            {
-                'size': 1,
-                'mapper': lambda x: HCI_LE_Set_Extended_Advertising_Data_Command.Operation(
-                    x
-                ).name,
-            },
-        ),
+        ('operation', ADVERTISING_DATA_OPERATION_SPEC),
         ('fragment_preference', 1),
         (
             'advertising_data',
@@ -4066,21 +4401,14 @@ class HCI_LE_Set_Extended_Advertising_Data_Command(HCI_Command):
         COMPLETE_DATA = 0x03
         UNCHANGED_DATA = 0x04
 
+    OPERATION_NAMES = {operation.value: operation.name for operation in Operation}
+
 
 # -----------------------------------------------------------------------------
 @HCI_Command.command(
-    # pylint: disable=line-too-long,unnecessary-lambda
     [
         ('advertising_handle', 1),
-        (
-            'operation',
-            {
-                'size': 1,
-                'mapper': lambda x: HCI_LE_Set_Extended_Advertising_Data_Command.Operation(
-                    x
-                ).name,
-            },
-        ),
+        ('operation', ADVERTISING_DATA_OPERATION_SPEC),
         ('fragment_preference', 1),
         (
             'scan_response_data',
@@ -4164,6 +4492,19 @@ class HCI_LE_Set_Periodic_Advertising_Enable_Command(HCI_Command):
     '''
 
 
+# -----------------------------------------------------------------------------
+# Escape sequences around the labels of hand-formatted command fields
+FIELD_LABEL_PREFIX, FIELD_LABEL_SUFFIX = color('{}', 'cyan').split('{}')
+
+
+def padded_field_labels(*labels: str) -> Tuple[str, ...]:
+    '''
+    Return the labels with a colon, padded so that the values after them line up
+    '''
+    width = max(map(len, labels)) + 1
+    return tuple(f'{label}:'.ljust(width) for label in labels)
+
+
 # -----------------------------------------------------------------------------
 @HCI_Command.command(fields=None)
 class HCI_LE_Set_Extended_Scan_Parameters_Command(HCI_Command):
@@ -4179,32 +4520,35 @@ class HCI_LE_Set_Extended_Scan_Parameters_Command(HCI_Command):
     EXTENDED_UNFILTERED_POLICY = 0x02
     EXTENDED_FILTERED_POLICY = 0x03
 
+    PHY_PARAMETERS_STRUCT = struct.Struct('<BHH')
+    FIELD_LABELS = padded_field_labels(
+        'own_address_type', 'scanning_filter_policy', 'scanning_phys'
+    )
+    PHY_FIELD_LABELS = padded_field_labels('scan_type', 'scan_interval', 'scan_window')
+
     @classmethod
     def from_parameters(cls, parameters):
         own_address_type = parameters[0]
         scanning_filter_policy = parameters[1]
         scanning_phys = parameters[2]
 
-        phy_bits_set = bin(scanning_phys).count('1')
-        scan_types = []
-        scan_intervals = []
-        scan_windows = []
-        for i in range(phy_bits_set):
-            scan_types.append(parameters[3 + (5 * i)])
-            scan_intervals.append(
-                struct.unpack_from('<H', parameters, 3 + (5 * i) + 1)[0]
-            )
-            scan_windows.append(
-                struct.unpack_from('<H', parameters, 3 + (5 * i) + 3)[0]
-            )
+        # Unpack the parameters of all the PHYs, then transpose them into one list
+        # per field
+        phy_bits_set = bit_count(scanning_phys)
+        phy_parameters = cls.PHY_PARAMETERS_STRUCT.iter_unpack(
+            parameters[3 : 3 + phy_bits_set * cls.PHY_PARAMETERS_STRUCT.size]
+        )
+        scan_types, scan_intervals, scan_windows = (
+            list(zip(*phy_parameters)) or [()] * 3
+        )
 
         return cls(
             own_address_type=own_address_type,
             scanning_filter_policy=scanning_filter_policy,
             scanning_phys=scanning_phys,
-            scan_types=scan_types,
-            scan_intervals=scan_intervals,
-            scan_windows=scan_windows,
+            scan_types=list(scan_types),
+            scan_intervals=list(scan_intervals),
+            scan_windows=list(scan_windows),
         )
 
     def __init__(
@@ -4224,50 +4568,60 @@ class HCI_LE_Set_Extended_Scan_Parameters_Command(HCI_Command):
         self.scan_intervals = scan_intervals
         self.scan_windows = scan_windows
 
-        self.parameters = bytes(
-            [own_address_type, scanning_filter_policy, scanning_phys]
+    @functools.cached_property
+    def parameters(self) -> bytes:
+        # Pack the parameters of all the PHYs in one call, only when first needed
+        phy_bits_set = bit_count(self.scanning_phys)
+        return compiled_struct(
+            '<BBB' + self.PHY_PARAMETERS_STRUCT.format[1:] * phy_bits_set
+        ).pack(
+            self.own_address_type,
+            self.scanning_filter_policy,
+            self.scanning_phys,
+            *itertools.chain.from_iterable(
+                itertools.islice(
+                    zip(self.scan_types, self.scan_intervals, self.scan_windows),
+                    phy_bits_set,
+                )
+            ),
         )
-        phy_bits_set = bin(scanning_phys).count('1')
-        for i in range(phy_bits_set):
-            self.parameters += struct.pack(
-                '<BHH', scan_types[i], scan_intervals[i], scan_windows[i]
-            )
 
     def __str__(self):
         scanning_phys_strs = bit_flags_to_strings(
             self.scanning_phys, HCI_LE_PHY_BIT_NAMES
         )
-        fields = [
-            (
-                'own_address_type:      ',
-                Address.address_type_name(self.own_address_type),
-            ),
-            ('scanning_filter_policy:', self.scanning_filter_policy),
-            ('scanning_phys:         ', ','.join(scanning_phys_strs)),
-        ]
-        for i, scanning_phy_str in enumerate(scanning_phys_strs):
-            fields.append(
+        fields = list(
+            zip(
+                self.FIELD_LABELS,
                 (
-                    f'{scanning_phy_str}.scan_type:    ',
+                    Address.address_type_name(self.own_address_type),
+                    self.scanning_filter_policy,
+                    ','.join(scanning_phys_strs),
+                ),
+            )
+        )
+        for scanning_phy_str, scan_type, scan_interval, scan_window in zip(
+            scanning_phys_strs, self.scan_types, self.scan_intervals, self.scan_windows
+        ):
+            fields.extend(
+                (f'{scanning_phy_str}.{label}', value)
+                for label, value in zip(
+                    self.PHY_FIELD_LABELS,
                     (
-                        'PASSIVE'
-                        if self.scan_types[i] == self.PASSIVE_SCANNING
-                        else 'ACTIVE'
+                        'PASSIVE' if scan_type == self.PASSIVE_SCANNING else 'ACTIVE',
+                        scan_interval,
+                        scan_window,
                     ),
                 )
             )
-            fields.append(
-                (f'{scanning_phy_str}.scan_interval:', self.scan_intervals[i])
-            )
-            fields.append((f'{scanning_phy_str}.scan_window:  ', self.scan_windows[i]))
 
         return (
             color(self.name, 'green')
             + ':\n'
             + '\n'.join(
                 [
-                    color('  ' + field[0], 'cyan') + ' ' + str(field[1])
-                    for field in fields
+                    f'{FIELD_LABEL_PREFIX}  {label}{FIELD_LABEL_SUFFIX} {value}'
+                    for label, value in fields
                 ]
             )
         )
@@ -4290,6 +4644,25 @@ class HCI_LE_Extended_Create_Connection_Command(HCI_Command):
     See Bluetooth spec @ 7.8.66 LE Extended Create Connection Command
     '''
 
+    PHY_PARAMETERS_STRUCT = struct.Struct('<HHHHHHHH')
+    FIELD_LABELS = padded_field_labels(
+        'initiator_filter_policy',
+        'own_address_type',
+        'peer_address_type',
+        'peer_address',
+        'initiating_phys',
+    )
+    PHY_FIELD_LABELS = padded_field_labels(
+        'scan_interval',
+        'scan_window',
+        'connection_interval_min',
+        'connection_interval_max',
+        'max_latency',
+        'supervision_timeout',
+        'min_ce_length',
+        'max_ce_length',
+    )
+
     @classmethod
     def from_parameters(cls, parameters):
         initiator_filter_policy = parameters[0]
@@ -4298,13 +4671,24 @@ class HCI_LE_Extended_Create_Connection_Command(HCI_Command):
         peer_address = Address.parse_address_preceded_by_type(parameters, 3)[1]
         initiating_phys = parameters[9]
 
-        phy_bits_set = bin(initiating_phys).count('1')
-
-        def read_parameter_list(offset):
-            return [
-                struct.unpack_from('<H', parameters, offset + 16 * i)[0]
-                for i in range(phy_bits_set)
-            ]
+        # Unpack the parameters of all the PHYs, then transpose them into one list
+        # per field
+        phy_bits_set = bit_count(initiating_phys)
+        phy_parameters = cls.PHY_PARAMETERS_STRUCT.iter_unpack(
+            parameters[10 : 10 + phy_bits_set * cls.PHY_PARAMETERS_STRUCT.size]
+        )
+        (
+            scan_intervals,
+            scan_windows,
+            connection_interval_mins,
+            connection_interval_maxs,
+            max_latencies,
+            supervision_timeouts,
+            min_ce_lengths,
+            max_ce_lengths,
+        ) = (
+            list(zip(*phy_parameters)) or [()] * 8
+        )
 
         return cls(
             initiator_filter_policy=initiator_filter_policy,
@@ -4312,14 +4696,14 @@ class HCI_LE_Extended_Create_Connection_Command(HCI_Command):
             peer_address_type=peer_address_type,
             peer_address=peer_address,
             initiating_phys=initiating_phys,
-            scan_intervals=read_parameter_list(10),
-            scan_windows=read_parameter_list(12),
-            connection_interval_mins=read_parameter_list(14),
-            connection_interval_maxs=read_parameter_list(16),
-            max_latencies=read_parameter_list(18),
-            supervision_timeouts=read_parameter_list(20),
-            min_ce_lengths=read_parameter_list(22),
-            max_ce_lengths=read_parameter_list(24),
+            scan_intervals=list(scan_intervals),
+            scan_windows=list(scan_windows),
+            connection_interval_mins=list(connection_interval_mins),
+            connection_interval_maxs=list(connection_interval_maxs),
+            max_latencies=list(max_latencies),
+            supervision_timeouts=list(supervision_timeouts),
+            min_ce_lengths=list(min_ce_lengths),
+            max_ce_lengths=list(max_ce_lengths),
         )
 
     def __init__(
@@ -4353,91 +4737,65 @@ class HCI_LE_Extended_Create_Connection_Command(HCI_Command):
         self.min_ce_lengths = min_ce_lengths
         self.max_ce_lengths = max_ce_lengths
 
-        self.parameters = (
-            bytes([initiator_filter_policy, own_address_type, peer_address_type])
-            + bytes(peer_address)
-            + bytes([initiating_phys])
+    @functools.cached_property
+    def parameters(self) -> bytes:
+        # Pack the parameters of all the PHYs in one call, only when first needed
+        phy_bits_set = bit_count(self.initiating_phys)
+        return compiled_struct(
+            '<BBB6sB' + self.PHY_PARAMETERS_STRUCT.format[1:] * phy_bits_set
+        ).pack(
+            self.initiator_filter_policy,
+            self.own_address_type,
+            self.peer_address_type,
+            bytes(self.peer_address),
+            self.initiating_phys,
+            *itertools.chain.from_iterable(
+                itertools.islice(
+                    zip(
+                        self.scan_intervals,
+                        self.scan_windows,
+                        self.connection_interval_mins,
+                        self.connection_interval_maxs,
+                        self.max_latencies,
+                        self.supervision_timeouts,
+                        self.min_ce_lengths,
+                        self.max_ce_lengths,
+                    ),
+                    phy_bits_set,
+                )
+            ),
         )
 
-        phy_bits_set = bin(initiating_phys).count('1')
-        for i in range(phy_bits_set):
-            self.parameters += struct.pack(
-                '<HHHHHHHH',
-                scan_intervals[i],
-                scan_windows[i],
-                connection_interval_mins[i],
-                connection_interval_maxs[i],
-                max_latencies[i],
-                supervision_timeouts[i],
-                min_ce_lengths[i],
-                max_ce_lengths[i],
-            )
-
     def __str__(self):
         initiating_phys_strs = bit_flags_to_strings(
             self.initiating_phys, HCI_LE_PHY_BIT_NAMES
         )
-        fields = [
-            ('initiator_filter_policy:', self.initiator_filter_policy),
-            (
-                'own_address_type:       ',
-                OwnAddressType(self.own_address_type).name,
-            ),
-            (
-                'peer_address_type:      ',
-                Address.address_type_name(self.peer_address_type),
-            ),
-            ('peer_address:           ', str(self.peer_address)),
-            ('initiating_phys:        ', ','.join(initiating_phys_strs)),
-        ]
-        for i, initiating_phys_str in enumerate(initiating_phys_strs):
-            fields.append(
-                (
-                    f'{initiating_phys_str}.scan_interval:          ',
-                    self.scan_intervals[i],
-                )
-            )
-            fields.append(
-                (
-                    f'{initiating_phys_str}.scan_window:            ',
-                    self.scan_windows[i],
-                )
-            )
-            fields.append(
-                (
-                    f'{initiating_phys_str}.connection_interval_min:',
-                    self.connection_interval_mins[i],
-                )
-            )
-            fields.append(
-                (
-                    f'{initiating_phys_str}.connection_interval_max:',
-                    self.connection_interval_maxs[i],
-                )
-            )
-            fields.append(
-                (
-                    f'{initiating_phys_str}.max_latency:            ',
-                    self.max_latencies[i],
-                )
-            )
-            fields.append(
-                (
-                    f'{initiating_phys_str}.supervision_timeout:    ',
-                    self.supervision_timeouts[i],
-                )
-            )
-            fields.append(
+        fields = list(
+            zip(
+                self.FIELD_LABELS,
                 (
-                    f'{initiating_phys_str}.min_ce_length:          ',
-                    self.min_ce_lengths[i],
-                )
+                    self.initiator_filter_policy,
+                    OwnAddressType(self.own_address_type).name,
+                    Address.address_type_name(self.peer_address_type),
+                    str(self.peer_address),
+                    ','.join(initiating_phys_strs),
+                ),
             )
-            fields.append(
-                (
-                    f'{initiating_phys_str}.max_ce_length:          ',
-                    self.max_ce_lengths[i],
-                )
+        )
+        for initiating_phys_str, *phy_values in zip(
+            initiating_phys_strs,
+            self.scan_intervals,
+            self.scan_windows,
+            self.connection_interval_mins,
+            self.connection_interval_maxs,
+            self.max_latencies,
+            self.supervision_timeouts,
+            self.min_ce_lengths,
+            self.max_ce_lengths,
+        ):
+            fields.extend(
+                (f'{initiating_phys_str}.{label}', value)
+                for label, value in zip(self.PHY_FIELD_LABELS, phy_values)
             )
 
         return (
@@ -4445,8 +4803,8 @@ class HCI_LE_Extended_Create_Connection_Command(HCI_Command):
             + ':\n'
             + '\n'.join(
                 [
-                    color('  ' + field[0], 'cyan') + ' ' + str(field[1])
-                    for field in fields
+                    f'{FIELD_LABEL_PREFIX}  {label}{FIELD_LABEL_SUFFIX} {value}'
+                    for label, value in fields
                 ]
             )
         )
@@ -4591,7 +4949,7 @@ class HCI_LE_Accept_CIS_Request_Command(HCI_Command):
 @HCI_Command.command(
     fields=[
         ('connection_handle', 2),
-        ('reason', {'size': 1, 'mapper': HCI_Constant.error_name}),
+        ('reason', ERROR_SPEC),
     ],
 )
 class HCI_LE_Reject_CIS_Request_Command(HCI_Command):
@@ -4613,10 +4971,7 @@ class HCI_LE_Reject_CIS_Request_Command(HCI_Command):
         ('controller_delay', 3),
         ('codec_configuration', 'v'),
     ],
-    return_parameters_fields=[
-        ('status', STATUS_SPEC),
-        ('connection_handle', 2),
-    ],
+    return_parameters_fields=STATUS_AND_CONNECTION_HANDLE_FIELDS,
 )
 class HCI_LE_Setup_ISO_Data_Path_Command(HCI_Command):
     '''
@@ -4641,10 +4996,7 @@ class HCI_LE_Setup_ISO_Data_Path_Command(HCI_Command):
         ('connection_handle', 2),
         ('data_path_direction', 1),
     ],
-    return_parameters_fields=[
-        ('status', STATUS_SPEC),
-        ('connection_handle', 2),
-    ],
+    return_parameters_fields=STATUS_AND_CONNECTION_HANDLE_FIELDS,
 )
 class HCI_LE_Remove_ISO_Data_Path_Command(HCI_Command):
     '''
@@ -4658,6 +5010,12 @@ class HCI_LE_Remove_ISO_Data_Path_Command(HCI_Command):
 # -----------------------------------------------------------------------------
 # HCI Events
 # -----------------------------------------------------------------------------
+HCI_EVENT_HEADER_STRUCT = struct.Struct('<BBB')
+
+# Escape sequences around the names of events
+EVENT_NAME_PREFIX, EVENT_NAME_SUFFIX = color('{}', 'magenta').split('{}')
+
+
 class HCI_Event(HCI_Packet):
     '''
     See Bluetooth spec @ Vol 2, Part E - 5.4.4 HCI Event Packet
@@ -4665,7 +5023,12 @@ class HCI_Event(HCI_Packet):
 
     hci_packet_type = HCI_EVENT_PACKET
     event_names: Dict[int, str] = {}
+    event_codes: Dict[str, int] = {}
     event_classes: Dict[int, Type[HCI_Event]] = {}
+    field_names: List[str] = []
+    fields_struct: Optional[struct.Struct] = None
+    fields_parsers: Iterable[Tuple[int, int, Callable]] = ()
+    fields_getter: Callable[[Any], Tuple[Any, ...]]
 
     @staticmethod
     def event(fields=()):
@@ -4674,11 +5037,22 @@ class HCI_Event(HCI_Packet):
         '''
 
         def inner(cls):
-            cls.name = cls.__name__.upper()
-            cls.event_code = key_with_value(cls.event_names, cls.name)
+            cls.name = sys.intern(cls.__name__.upper())
+            cls.event_code = cls.event_codes.get(cls.name)
             if cls.event_code is None:
                 raise KeyError(f'event {cls.name} not found in event_names')
             cls.fields = fields
+            cls.field_names = HCI_Object.field_names(fields or ())
+            # Always set the layout attributes, so that a subclass never decodes
+            # with the fixed layout of its parent
+            cls.fields_struct = HCI_Object.fields_struct(fields)
+            if cls.fields_struct is not None:
+                cls.fields_parsers = HCI_Object.fields_parsers(fields)
+                cls.fields_getter = staticmethod(
+                    HCI_Object.fields_getter(cls.field_names)
+                )
+            else:
+                cls.fields_parsers = ()
 
             # Patch the __init__ method to fix the event_code
             def init(self, parameters=None, **kwargs):
@@ -4709,12 +5083,16 @@ class HCI_Event(HCI_Packet):
 
     @staticmethod
     def register_events(symbols: Dict[str, Any]) -> None:
-        HCI_Event.event_names.update(HCI_Event.event_map(symbols))
+        event_names = HCI_Event.event_map(symbols)
+        HCI_Event.event_names.update(event_names)
+        HCI_Event.event_codes.update(
+            (event_name, event_code) for event_code, event_name in event_names.items()
+        )
 
     @staticmethod
     def registered(event_class):
-        event_class.name = event_class.__name__.upper()
-        event_class.event_code = key_with_value(HCI_Event.event_names, event_class.name)
+        event_class.name = sys.intern(event_class.__name__.upper())
+        event_class.event_code = HCI_Event.event_codes.get(event_class.name)
         if event_class.event_code is None:
             raise KeyError(f'event {event_class.name} not found in event_names')
 
@@ -4725,8 +5103,7 @@ class HCI_Event(HCI_Packet):
 
     @staticmethod
     def from_bytes(packet: bytes) -> HCI_Event:
-        event_code = packet[1]
-        length = packet[2]
+        _, event_code, length = HCI_EVENT_HEADER_STRUCT.unpack_from(packet)
         parameters = packet[3:]
         if len(parameters) != length:
             raise ValueError('invalid packet length')
@@ -4758,6 +5135,22 @@ class HCI_Event(HCI_Packet):
     @classmethod
     def from_parameters(cls, parameters):
         self = cls.__new__(cls)
+        fields_struct = cls.fields_struct
+        if fields_struct is not None and fields_struct.size == len(parameters):
+            # Fixed layout, all the fields can be unpacked in one call, and the
+            # registered class already knows its name and event_code
+            self.name = cls.name
+            self.event_code = cls.event_code
+            self.parameters = parameters
+            self.__dict__.update(
+                zip(
+                    cls.field_names,
+                    HCI_Object.values_from_struct(
+                        parameters, fields_struct, cls.fields_parsers
+                    ),
+                )
+            )
+            return self
         HCI_Event.__init__(self, self.event_code, parameters)
         if fields := getattr(self, 'fields', None):
             HCI_Object.init_from_bytes(self, parameters, 0, fields)
@@ -4769,22 +5162,62 @@ class HCI_Event(HCI_Packet):
         # default value to allow building derived HCI_Event without event_code.
         assert event_code != -1
         super().__init__(HCI_Event.event_name(event_code))
-        if (fields := getattr(self, 'fields', None)) and kwargs:
-            HCI_Object.init_from_fields(self, fields, kwargs)
-            if parameters is None:
-                parameters = HCI_Object.dict_to_bytes(kwargs, fields)
+        from_fields = bool(getattr(self, 'fields', None) and kwargs)
+        if from_fields:
+            for field_name in self.field_names:
+                setattr(self, field_name, kwargs[field_name])
         self.event_code = event_code
-        self.parameters = parameters
+        if parameters is not None or not from_fields:
+            # When built from field values, the parameters are serialized on demand
+            self.parameters = parameters
 
-    def to_bytes(self):
+    @functools.cached_property
+    def parameters(self) -> Optional[bytes]:
+        return self.fields_to_bytes()
+
+    def fields_to_bytes(self) -> bytes:
+        '''
+        Serialize the parameters of an event from its field values.
+        '''
+        if fields_struct := self.fields_struct:
+            fields_bytes = HCI_Object.values_to_struct_bytes(
+                list(self.fields_getter(self)),
+                fields_struct,
+                self.fields_parsers,
+            )
+            if fields_bytes is not None:
+                return fields_bytes
+        return HCI_Object.dict_to_bytes(self.__dict__, self.fields)
+
+    def serialized_size(self) -> int:
+        return HCI_EVENT_HEADER_STRUCT.size + (
+            0 if self.parameters is None else len(self.parameters)
+        )
+
+    def serialize_into(self, buffer, offset: int = 0) -> int:
+        '''
+        Write the packet into a preallocated buffer at the given offset, and return
+        the offset right after it.
+        '''
         parameters = b'' if self.parameters is None else self.parameters
-        return bytes([HCI_EVENT_PACKET, self.event_code, len(parameters)]) + parameters
+        HCI_EVENT_HEADER_STRUCT.pack_into(
+            buffer, offset, HCI_EVENT_PACKET, self.event_code, len(parameters)
+        )
+        offset += HCI_EVENT_HEADER_STRUCT.size
+        end = offset + len(parameters)
+        buffer[offset:end] = parameters
+        return end
+
+    def to_bytes(self):
+        buffer = bytearray(self.serialized_size())
+        self.serialize_into(buffer)
+        return bytes(buffer)
 
     def __bytes__(self):
         return self.to_bytes()
 
     def __str__(self):
-        result = color(self.name, 'magenta')
+        result = f'{EVENT_NAME_PREFIX}{self.name}{EVENT_NAME_SUFFIX}'
         if fields := getattr(self, 'fields', None):
             result += ':\n' + HCI_Object.format_fields(self.__dict__, fields, '  ')
         else:
@@ -4794,6 +5227,7 @@ class HCI_Event(HCI_Packet):
 
 
 HCI_Event.register_events(globals())
+HCI_Packet.packet_classes[HCI_EVENT_PACKET] = HCI_Event
 
 
 # -----------------------------------------------------------------------------
@@ -4803,6 +5237,7 @@ class HCI_Extended_Event(HCI_Event):
     '''
 
     subevent_names: Dict[int, str] = {}
+    subevent_codes: Dict[str, int] = {}
     subevent_classes: Dict[int, Type[HCI_Extended_Event]]
 
     @classmethod
@@ -4812,11 +5247,22 @@ class HCI_Extended_Event(HCI_Event):
         '''
 
         def inner(cls):
-            cls.name = cls.__name__.upper()
-            cls.subevent_code = key_with_value(cls.subevent_names, cls.name)
+            cls.name = sys.intern(cls.__name__.upper())
+            cls.subevent_code = cls.subevent_codes.get(cls.name)
             if cls.subevent_code is None:
                 raise KeyError(f'subevent {cls.name} not found in subevent_names')
             cls.fields = fields
+            cls.field_names = HCI_Object.field_names(fields or ())
+            # Always set the layout attributes, so that a subclass never decodes
+            # with the fixed layout of its parent
+            cls.fields_struct = HCI_Object.fields_struct(fields)
+            if cls.fields_struct is not None:
+                cls.fields_parsers = HCI_Object.fields_parsers(fields)
+                cls.fields_getter = staticmethod(
+                    HCI_Object.fields_getter(cls.field_names)
+                )
+            else:
+                cls.fields_parsers = ()
 
             # Patch the __init__ method to fix the subevent_code
             original_init = cls.__init__
@@ -4851,11 +5297,33 @@ class HCI_Extended_Event(HCI_Event):
 
     @classmethod
     def register_subevents(cls, symbols: Dict[str, Any]) -> None:
-        cls.subevent_names.update(cls.subevent_map(symbols))
+        subevent_names = cls.subevent_map(symbols)
+        cls.subevent_names.update(subevent_names)
+        cls.subevent_codes.update(
+            (subevent_name, subevent_code)
+            for subevent_code, subevent_name in subevent_names.items()
+        )
 
     @classmethod
     def from_parameters(cls, parameters):
         self = cls.__new__(cls)
+        fields_struct = cls.fields_struct
+        if fields_struct is not None and fields_struct.size == len(parameters) - 1:
+            # Fixed layout after the subevent code, all the fields can be unpacked in
+            # one call, and the registered class already knows its name and codes
+            self.name = cls.name
+            self.event_code = cls.event_code
+            self.subevent_code = cls.subevent_code
+            self.parameters = parameters
+            self.__dict__.update(
+                zip(
+                    cls.field_names,
+                    HCI_Object.values_from_struct(
+                        parameters, fields_struct, cls.fields_parsers, 1
+                    ),
+                )
+            )
+            return self
         HCI_Extended_Event.__init__(self, self.subevent_code, parameters)
         if fields := getattr(self, 'fields', None):
             HCI_Object.init_from_bytes(self, parameters, 1, fields)
@@ -4864,15 +5332,14 @@ class HCI_Extended_Event(HCI_Event):
     def __init__(self, subevent_code=None, parameters=None, **kwargs):
         assert subevent_code is not None
         self.subevent_code = subevent_code
-        if parameters is None and (fields := getattr(self, 'fields', None)) and kwargs:
-            parameters = bytes([subevent_code]) + HCI_Object.dict_to_bytes(
-                kwargs, fields
-            )
         super().__init__(self.event_code, parameters, **kwargs)
 
         # Override the name in order to adopt the subevent name instead
         self.name = self.subevent_name(subevent_code)
 
+    def fields_to_bytes(self) -> bytes:
+        return UINT8_STRUCT.pack(self.subevent_code) + super().fields_to_bytes()
+
 
 # -----------------------------------------------------------------------------
 class HCI_LE_Meta_Event(HCI_Extended_Event):
@@ -4962,9 +5429,27 @@ class HCI_LE_Advertising_Report_Event(HCI_LE_Meta_Event):
             ('rssi', -1),
         ]
 
+        # Fixed layout of the fields that precede the data, ending with its length
+        PREFIX_FIELDS = FIELDS[:3] + [('data_length', 1)]
+        PREFIX_STRUCT = HCI_Object.fields_struct(PREFIX_FIELDS)
+        PREFIX_PARSERS = HCI_Object.fields_parsers(PREFIX_FIELDS)
+
         @classmethod
         def from_parameters(cls, parameters, offset):
-            return cls.from_bytes(parameters, offset, cls.FIELDS)
+            event_type, address_type, address, data_length = (
+                HCI_Object.values_from_struct(
+                    parameters, cls.PREFIX_STRUCT, cls.PREFIX_PARSERS, offset
+                )
+            )
+            offset += cls.PREFIX_STRUCT.size
+            report = cls.__new__(cls)
+            report.fields = cls.FIELDS
+            report.event_type = event_type
+            report.address_type = address_type
+            report.address = address
+            report.data = parameters[offset : offset + data_length]
+            report.rssi = INT8_STRUCT.unpack_from(parameters, offset + data_length)[0]
+            return report
 
         def event_type_string(self):
             return HCI_LE_Advertising_Report_Event.event_type_name(self.event_type)
@@ -5115,8 +5600,8 @@ class HCI_LE_Enhanced_Connection_Complete_Event(HCI_LE_Meta_Event):
     [
         ('status', STATUS_SPEC),
         ('connection_handle', 2),
-        ('tx_phy', {'size': 1, 'mapper': HCI_Constant.le_phy_name}),
-        ('rx_phy', {'size': 1, 'mapper': HCI_Constant.le_phy_name}),
+        ('tx_phy', LE_PHY_SPEC),
+        ('rx_phy', LE_PHY_SPEC),
     ]
 )
 class HCI_LE_PHY_Update_Complete_Event(HCI_LE_Meta_Event):
@@ -5172,8 +5657,8 @@ class HCI_LE_Extended_Advertising_Report_Event(HCI_LE_Meta_Event):
             ('event_type', 2),
             ('address_type', Address.ADDRESS_TYPE_SPEC),
             ('address', Address.parse_address_preceded_by_type),
-            ('primary_phy', {'size': 1, 'mapper': HCI_Constant.le_phy_name}),
-            ('secondary_phy', {'size': 1, 'mapper': HCI_Constant.le_phy_name}),
+            ('primary_phy', LE_PHY_SPEC),
+            ('secondary_phy', LE_PHY_SPEC),
             ('advertising_sid', 1),
             ('tx_power', 1),
             ('rssi', -1),
@@ -5189,9 +5674,23 @@ class HCI_LE_Extended_Advertising_Report_Event(HCI_LE_Meta_Event):
             ),
         ]
 
+        # Fixed layout of the fields that precede the data, ending with its length
+        PREFIX_FIELDS = FIELDS[:-1] + [('data_length', 1)]
+        PREFIX_STRUCT = HCI_Object.fields_struct(PREFIX_FIELDS)
+        PREFIX_PARSERS = HCI_Object.fields_parsers(PREFIX_FIELDS)
+        PREFIX_FIELD_NAMES = HCI_Object.field_names(FIELDS[:-1])
+
         @classmethod
         def from_parameters(cls, parameters, offset):
-            return cls.from_bytes(parameters, offset, cls.FIELDS)
+            *values, data_length = HCI_Object.values_from_struct(
+                parameters, cls.PREFIX_STRUCT, cls.PREFIX_PARSERS, offset
+            )
+            offset += cls.PREFIX_STRUCT.size
+            report = cls.__new__(cls)
+            report.fields = cls.FIELDS
+            report.__dict__.update(zip(cls.PREFIX_FIELD_NAMES, values))
+            report.data = parameters[offset : offset + data_length]
+            return report
 
         def event_type_string(self):
             return HCI_LE_Extended_Advertising_Report_Event.event_type_string(
@@ -5356,7 +5855,7 @@ class HCI_Inquiry_Result_Event(HCI_Event):
         ('page_scan_repetition_mode', 1),
         ('reserved', 1),
         ('reserved', 1),
-        ('class_of_device', {'size': 3, 'mapper': map_class_of_device}),
+        ('class_of_device', CLASS_OF_DEVICE_SPEC),
         ('clock_offset', 2),
     ]
 
@@ -5454,7 +5953,7 @@ class HCI_Connection_Request_Event(HCI_Event):
     [
         ('status', STATUS_SPEC),
         ('connection_handle', 2),
-        ('reason', {'size': 1, 'mapper': HCI_Constant.error_name}),
+        ('reason', ERROR_SPEC),
     ]
 )
 class HCI_Disconnection_Complete_Event(HCI_Event):
@@ -5570,6 +6069,10 @@ class HCI_Command_Complete_Event(HCI_Event):
     return_parameters = b''
     command_opcode: int
 
+    # Layout of the fields that precede the return parameters
+    HEADER_STRUCT = struct.Struct('<BH')
+    HEADER_SIZE = HEADER_STRUCT.size
+
     def map_return_parameters(self, return_parameters):
         '''Map simple 'status' return parameters to their named constant form'''
 
@@ -5587,9 +6090,10 @@ class HCI_Command_Complete_Event(HCI_Event):
     def from_parameters(parameters):
         self = HCI_Command_Complete_Event.__new__(HCI_Command_Complete_Event)
         HCI_Event.__init__(self, self.event_code, parameters)
-        HCI_Object.init_from_bytes(
-            self, parameters, 0, HCI_Command_Complete_Event.fields
+        (self.num_hci_command_packets, self.command_opcode) = (
+            HCI_Command_Complete_Event.HEADER_STRUCT.unpack_from(parameters)
         )
+        self.return_parameters = parameters[HCI_Command_Complete_Event.HEADER_SIZE :]
 
         # Parse the return parameters
         if (
@@ -5610,11 +6114,13 @@ class HCI_Command_Complete_Event(HCI_Event):
         return self
 
     def __str__(self):
-        return f'{color(self.name, "magenta")}:\n' + HCI_Object.format_fields(
-            self.__dict__,
-            self.fields,
-            '  ',
-            {'return_parameters': self.map_return_parameters},
+        return f'{EVENT_NAME_PREFIX}{self.name}{EVENT_NAME_SUFFIX}:\n' + (
+            HCI_Object.format_fields(
+                self.__dict__,
+                self.fields,
+                '  ',
+                {'return_parameters': self.map_return_parameters},
+            )
         )
 
 
@@ -5650,7 +6156,7 @@ class HCI_Command_Status_Event(HCI_Event):
     [
         ('status', STATUS_SPEC),
         ('bd_addr', Address.parse_address),
-        ('new_role', {'size': 1, 'mapper': HCI_Constant.role_name}),
+        ('new_role', ROLE_SPEC),
     ]
 )
 class HCI_Role_Change_Event(HCI_Event):
@@ -5822,7 +6328,7 @@ class HCI_Inquiry_Result_With_RSSI_Event(HCI_Event):
         ('bd_addr', Address.parse_address),
         ('page_scan_repetition_mode', 1),
         ('reserved', 1),
-        ('class_of_device', {'size': 3, 'mapper': map_class_of_device}),
+        ('class_of_device', CLASS_OF_DEVICE_SPEC),
         ('clock_offset', 2),
         ('rssi', -1),
     ]
@@ -5969,7 +6475,7 @@ class HCI_Synchronous_Connection_Changed_Event(HCI_Event):
         ('bd_addr', Address.parse_address),
         ('page_scan_repetition_mode', 1),
         ('reserved', 1),
-        ('class_of_device', {'size': 3, 'mapper': map_class_of_device}),
+        ('class_of_device', CLASS_OF_DEVICE_SPEC),
         ('clock_offset', 2),
         ('rssi', -1),
         ('extended_inquiry_response', 240),
@@ -6093,6 +6599,14 @@ class HCI_AclDataPacket(HCI_Packet):
     See Bluetooth spec @ 5.4.2 HCI ACL Data Packets
     '''
 
+    __slots__ = (
+        'connection_handle',
+        'pb_flag',
+        'bc_flag',
+        'data_total_length',
+        'data',
+    )
+
     hci_packet_type = HCI_ACL_DATA_PACKET
 
     @staticmethod
@@ -6136,6 +6650,9 @@ class HCI_AclDataPacket(HCI_Packet):
         )
 
 
+HCI_Packet.packet_classes[HCI_ACL_DATA_PACKET] = HCI_AclDataPacket
+
+
 # -----------------------------------------------------------------------------
 class HCI_SynchronousDataPacket(HCI_Packet):
     '''
@@ -6191,6 +6708,9 @@ class HCI_SynchronousDataPacket(HCI_Packet):
         )
 
 
+HCI_Packet.packet_classes[HCI_SYNCHRONOUS_DATA_PACKET] = HCI_SynchronousDataPacket
+
+
 # -----------------------------------------------------------------------------
 @dataclasses.dataclass
 class HCI_IsoDataPacket(HCI_Packet):
@@ -6287,6 +6807,9 @@ class HCI_IsoDataPacket(HCI_Packet):
         )
 
 
+HCI_Packet.packet_classes[HCI_ISO_DATA_PACKET] = HCI_IsoDataPacket
+
+
 # -----------------------------------------------------------------------------
 class HCI_AclDataPacketAssembler:
     current_data: Optional[bytes]
@@ -58,6 +58,14 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 
 
+# -----------------------------------------------------------------------------
+# Constants
+# -----------------------------------------------------------------------------
+# Colored prefixes of the packet debug logs, computed once
+HOST_TO_CONTROLLER_LOG_PREFIX = color('### HOST -> CONTROLLER', 'blue')
+CONTROLLER_TO_HOST_LOG_PREFIX = color('### CONTROLLER -> HOST', 'green')
+
+
 # -----------------------------------------------------------------------------
 class AclPacketQueue:
     max_packet_size: int
@@ -508,7 +516,7 @@ class Host(AbortableEventEmitter):
         self.hci_metadata = getattr(source, 'metadata', self.hci_metadata)
 
     def send_hci_packet(self, packet: hci.HCI_Packet) -> None:
-        logger.debug(f'{color("### HOST -> CONTROLLER", "blue")}: {packet}')
+        logger.debug('%s: %s', HOST_TO_CONTROLLER_LOG_PREFIX, packet)
         if self.snooper:
             self.snooper.snoop(bytes(packet), Snooper.Direction.HOST_TO_CONTROLLER)
         if self.hci_sink:
@@ -619,9 +627,14 @@ class Host(AbortableEventEmitter):
 
     @property
     def supported_le_features(self):
-        return [
-            feature for feature in range(64) if self.local_le_features & (1 << feature)
-        ]
+        # Only visit the bits that are set, lowest first
+        features = []
+        mask = self.local_le_features
+        while mask:
+            lowest_bit = mask & -mask
+            features.append(lowest_bit.bit_length() - 1)
+            mask ^= lowest_bit
+        return features
 
     # Packet Sink protocol (packets coming from the controller via HCI)
     def on_packet(self, packet: bytes) -> None:
@@ -642,7 +655,7 @@ class Host(AbortableEventEmitter):
         self.emit('flush')
 
     def on_hci_packet(self, packet: hci.HCI_Packet) -> None:
-        logger.debug(f'{color("### CONTROLLER -> HOST", "green")}: {packet}')
+        logger.debug('%s: %s', CONTROLLER_TO_HOST_LOG_PREFIX, packet)
 
         if self.snooper:
             self.snooper.snoop(bytes(packet), Snooper.Direction.CONTROLLER_TO_HOST)
@@ -80,7 +80,7 @@ class AudioLocation(enum.IntFlag):
 
     @property
     def channel_count(self) -> int:
-        return bin(self.value).count('1')
+        return core.bit_count(self.value)
 
 
 class AudioInputType(enum.IntEnum):
@@ -117,7 +117,10 @@ class PacketParser:
 
     def feed_data(self, data: bytes) -> None:
         data_offset = 0
-        data_left = len(data)
+        if self.state == PacketParser.NEED_TYPE and not self.packet:
+            # Not in the middle of a packet, emit the complete packets directly
+            data_offset = self.feed_complete_packets(data, data_offset)
+        data_left = len(data) - data_offset
         while data_left and self.bytes_needed:
             consumed = min(self.bytes_needed, data_left)
             self.packet.extend(data[data_offset : data_offset + consumed])
@@ -145,15 +148,49 @@ class PacketParser:
 
                 # Emit a packet if one is complete
                 if self.state == PacketParser.NEED_BODY and not self.bytes_needed:
-                    if self.sink:
-                        try:
-                            self.sink.on_packet(bytes(self.packet))
-                        except Exception as error:
-                            logger.exception(
-                                color(f'!!! Exception in on_packet: {error}', 'red')
-                            )
+                    self.emit_packet(bytes(self.packet))
                     self.reset()
 
+                    # Emit the complete packets that follow directly
+                    data_offset = self.feed_complete_packets(data, data_offset)
+                    data_left = len(data) - data_offset
+
+    def feed_complete_packets(self, data: bytes, data_offset: int) -> int:
+        '''
+        Emit all the complete packets found in the data starting at data_offset, in a
+        single pass and without buffering them. Returns the offset of the first byte
+        that isn't part of a complete packet.
+        '''
+        data_size = len(data)
+        while data_offset < data_size:
+            packet_type = data[data_offset]
+            packet_info = HCI_PACKET_INFO.get(
+                packet_type
+            ) or self.extended_packet_info.get(packet_type)
+            if packet_info is None:
+                # Let the incremental parser deal with it
+                break
+            header_end = data_offset + 1 + packet_info[0] + packet_info[1]
+            if header_end > data_size:
+                break
+            body_length = struct.unpack_from(
+                packet_info[2], data, data_offset + 1 + packet_info[1]
+            )[0]
+            packet_end = header_end + body_length
+            if packet_end > data_size:
+                break
+            self.emit_packet(bytes(data[data_offset:packet_end]))
+            data_offset = packet_end
+
+        return data_offset
+
+    def emit_packet(self, packet: bytes) -> None:
+        if self.sink:
+            try:
+                self.sink.on_packet(packet)
+            except Exception as error:
+                logger.exception(color(f'!!! Exception in on_packet: {error}', 'red'))
+
     def set_packet_sink(self, sink: TransportSink) -> None:
         self.sink = sink
 
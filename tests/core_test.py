@@ -15,7 +15,7 @@
 # -----------------------------------------------------------------------------
 # Imports
 # -----------------------------------------------------------------------------
-from bumble.core import AdvertisingData, UUID, get_dict_key_by_value
+from bumble.core import AdvertisingData, UUID, bit_count, get_dict_key_by_value
 
 
 # -----------------------------------------------------------------------------
@@ -50,6 +50,13 @@ def test_get_dict_key_by_value():
     assert get_dict_key_by_value(dictionary, 3) is None
 
 
+# -----------------------------------------------------------------------------
+def test_bit_count():
+    assert bit_count(0) == 0
+    assert bit_count(0b101) == 2
+    assert bit_count(0xFFFFFFFFFFFFFFFF) == 64
+
+
 # -----------------------------------------------------------------------------
 def test_uuid_to_hex_str() -> None:
     assert UUID("b5ea").to_hex_str() == "B5EA"
@@ -70,4 +77,5 @@ def test_uuid_to_hex_str() -> None:
 if __name__ == '__main__':
     test_ad_data()
     test_get_dict_key_by_value()
+    test_bit_count()
     test_uuid_to_hex_str()
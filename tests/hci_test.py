@@ -15,9 +15,12 @@
 # -----------------------------------------------------------------------------
 # Imports
 # -----------------------------------------------------------------------------
+import pytest
 
 from bumble.hci import (
     HCI_DISCONNECT_COMMAND,
+    HCI_EVENT_PACKET,
+    HCI_LE_1M_PHY,
     HCI_LE_1M_PHY_BIT,
     HCI_LE_CODED_PHY_BIT,
     HCI_LE_READ_BUFFER_SIZE_COMMAND,
@@ -33,10 +36,13 @@ from bumble.hci import (
     HCI_Command_Status_Event,
     HCI_CustomPacket,
     HCI_Disconnect_Command,
+    HCI_Enhanced_Accept_Synchronous_Connection_Request_Command,
     HCI_Event,
+    HCI_IO_Capability_Request_Reply_Command,
     HCI_IsoDataPacket,
     HCI_LE_Add_Device_To_Filter_Accept_List_Command,
     HCI_LE_Advertising_Report_Event,
+    HCI_LE_Extended_Advertising_Report_Event,
     HCI_LE_Channel_Selection_Algorithm_Event,
     HCI_LE_Connection_Complete_Event,
     HCI_LE_Connection_Update_Command,
@@ -52,19 +58,25 @@ from bumble.hci import (
     HCI_LE_Set_Default_PHY_Command,
     HCI_LE_Set_Event_Mask_Command,
     HCI_LE_Set_Extended_Advertising_Enable_Command,
+    HCI_LE_Set_Extended_Advertising_Parameters_Command,
     HCI_LE_Set_Extended_Scan_Parameters_Command,
     HCI_LE_Set_Random_Address_Command,
     HCI_LE_Set_Scan_Enable_Command,
     HCI_LE_Set_Scan_Parameters_Command,
     HCI_LE_Setup_ISO_Data_Path_Command,
     HCI_Number_Of_Completed_Packets_Event,
+    HCI_Object,
     HCI_Packet,
     HCI_PIN_Code_Request_Reply_Command,
+    HCI_Read_Local_Supported_Codecs_Command,
+    HCI_Read_Local_Supported_Codecs_V2_Command,
     HCI_Read_Local_Supported_Commands_Command,
     HCI_Read_Local_Supported_Features_Command,
     HCI_Read_Local_Version_Information_Command,
     HCI_Reset_Command,
     HCI_Set_Event_Mask_Command,
+    HCI_Write_Extended_Inquiry_Response_Command,
+    hci_vendor_command_op_code,
 )
 
 
@@ -93,6 +105,23 @@ def test_HCI_Event():
     basic_check(event)
 
 
+# -----------------------------------------------------------------------------
+def test_HCI_Event_serialize_into():
+    events = [
+        HCI_Event(0xF9),
+        HCI_Command_Status_Event(
+            status=0, num_hci_command_packets=1, command_opcode=HCI_RESET_COMMAND
+        ),
+    ]
+    buffer = bytearray(sum(event.serialized_size() for event in events))
+    offset = 0
+    for event in events:
+        offset = event.serialize_into(memoryview(buffer), offset)
+    assert offset == len(buffer)
+    assert buffer == b''.join(bytes(event) for event in events)
+    assert bytes(events[0]) == bytes([HCI_EVENT_PACKET, 0xF9, 0])
+
+
 # -----------------------------------------------------------------------------
 def test_HCI_LE_Connection_Complete_Event():
     address = Address('00:11:22:33:44:55')
@@ -107,7 +136,16 @@ def test_HCI_LE_Connection_Complete_Event():
         supervision_timeout=5,
         central_clock_accuracy=6,
     )
+    assert 'parameters' not in event.__dict__
     basic_check(event)
+    assert event.parameters[0] == HCI_LE_CONNECTION_COMPLETE_EVENT
+
+    parsed = HCI_Packet.from_bytes(event.to_bytes())
+    assert isinstance(parsed, HCI_LE_Connection_Complete_Event)
+    assert parsed.subevent_code == event.subevent_code
+    assert parsed.peer_address == address
+    assert parsed.peer_address.address_type == 1
+    assert (parsed.connection_interval, parsed.central_clock_accuracy) == (3, 6)
 
 
 # -----------------------------------------------------------------------------
@@ -127,6 +165,37 @@ def test_HCI_LE_Advertising_Report_Event():
     basic_check(event)
 
 
+# -----------------------------------------------------------------------------
+def test_HCI_LE_Extended_Advertising_Report_Event():
+    report_class = HCI_LE_Extended_Advertising_Report_Event.Report
+    reports = [
+        report_class(
+            report_class.FIELDS,
+            event_type=0x13,
+            address_type=Address.RANDOM_DEVICE_ADDRESS,
+            address=Address('F0:F1:F2:F3:F4:F5'),
+            primary_phy=HCI_LE_1M_PHY,
+            secondary_phy=0,
+            advertising_sid=2,
+            tx_power=127,
+            rssi=-60,
+            periodic_advertising_interval=0,
+            direct_address_type=Address.PUBLIC_DEVICE_ADDRESS,
+            direct_address=Address('00:11:22:33:44:55/P'),
+            data=data,
+        )
+        for data in (bytes.fromhex('020106'), b'')
+    ]
+    event = HCI_LE_Extended_Advertising_Report_Event(reports)
+    basic_check(event)
+
+    parsed = HCI_Packet.from_bytes(event.to_bytes())
+    assert [report.data for report in parsed.reports] == [b'\x02\x01\x06', b'']
+    assert parsed.reports[0].address == reports[0].address
+    assert parsed.reports[0].rssi == -60
+    assert parsed.reports[1].direct_address == reports[1].direct_address
+
+
 # -----------------------------------------------------------------------------
 def test_HCI_LE_Read_Remote_Features_Complete_Event():
     event = HCI_LE_Read_Remote_Features_Complete_Event(
@@ -241,6 +310,8 @@ def test_HCI_PIN_Code_Request_Reply_Command():
 def test_HCI_Reset_Command():
     command = HCI_Reset_Command()
     basic_check(command)
+    assert bytes(command) == bytes.fromhex('01030c00')
+    assert bytes(command) is bytes(HCI_Reset_Command())
 
 
 # -----------------------------------------------------------------------------
@@ -249,12 +320,43 @@ def test_HCI_Read_Local_Version_Information_Command():
     basic_check(command)
 
 
+# -----------------------------------------------------------------------------
+def test_HCI_Write_Extended_Inquiry_Response_Command():
+    command = HCI_Write_Extended_Inquiry_Response_Command(
+        fec_required=0, extended_inquiry_response=bytes.fromhex('0909426d626c65')
+    )
+    assert len(command.parameters) == 241
+    assert command.parameters[1:8] == bytes.fromhex('0909426d626c65')
+    assert command.parameters[8:] == bytes(233)
+    parsed = HCI_Packet.from_bytes(bytes(command))
+    assert parsed.extended_inquiry_response == command.parameters[1:]
+
+
 # -----------------------------------------------------------------------------
 def test_HCI_Read_Local_Supported_Commands_Command():
     command = HCI_Read_Local_Supported_Commands_Command()
     basic_check(command)
 
 
+# -----------------------------------------------------------------------------
+def test_HCI_Read_Local_Supported_Codecs_Command():
+    return_parameters = HCI_Read_Local_Supported_Codecs_Command.parse_return_parameters(
+        bytes.fromhex('0003020305013412cdab')
+    )
+    assert return_parameters.standard_codec_ids == [2, 3, 5]
+    assert return_parameters.vendor_specific_codec_ids == [0xABCD1234]
+
+    return_parameters = (
+        HCI_Read_Local_Supported_Codecs_V2_Command.parse_return_parameters(
+            bytes.fromhex('000202010501013412cdab04')
+        )
+    )
+    assert return_parameters.standard_codec_ids == [2, 5]
+    assert return_parameters.standard_codec_transports == [1, 1]
+    assert return_parameters.vendor_specific_codec_ids == [0xABCD1234]
+    assert return_parameters.vendor_specific_codec_transports == [4]
+
+
 # -----------------------------------------------------------------------------
 def test_HCI_Read_Local_Supported_Features_Command():
     command = HCI_Read_Local_Supported_Features_Command()
@@ -267,6 +369,119 @@ def test_HCI_Disconnect_Command():
     basic_check(command)
 
 
+# -----------------------------------------------------------------------------
+def test_serialize_out_of_range_uint8_fields():
+    with pytest.raises(ValueError):
+        HCI_Disconnect_Command(connection_handle=123, reason=256)
+    with pytest.raises(ValueError):
+        HCI_Object.serialize_field(256, 1)
+    with pytest.raises(ValueError):
+        HCI_Object.serialize_field(bytes(256), 'v')
+    with pytest.raises(ValueError):
+        HCI_Object.dict_to_bytes({'values': [0] * 256}, [[('values', 1)]])
+
+
+# -----------------------------------------------------------------------------
+def test_subclass_does_not_inherit_fixed_layout():
+    op_code = hci_vendor_command_op_code(0x3FF)
+    HCI_Command.command_op_codes['HCI_VARIABLE_LAYOUT_COMMAND'] = op_code
+    try:
+
+        @HCI_Command.command([('value', 'v')])
+        class HCI_Variable_Layout_Command(HCI_Disconnect_Command):
+            pass
+
+        assert HCI_Variable_Layout_Command.fields_struct is None
+        assert not HCI_Variable_Layout_Command.fields_parsers
+        assert HCI_Variable_Layout_Command.empty_packet is None
+
+        # Same length as the parent's fixed layout, but a different layout
+        command = HCI_Variable_Layout_Command(value=b'\x01\x02')
+        parsed = HCI_Packet.from_bytes(bytes(command))
+        assert parsed.value == b'\x01\x02'
+        assert not hasattr(parsed, 'connection_handle')
+    finally:
+        del HCI_Command.command_op_codes['HCI_VARIABLE_LAYOUT_COMMAND']
+        del HCI_Command.command_classes[op_code]
+
+
+# -----------------------------------------------------------------------------
+def test_HCI_Command_serialize_into():
+    commands = [
+        HCI_Reset_Command(),
+        HCI_Disconnect_Command(connection_handle=0x0123, reason=0x13),
+    ]
+    buffer = bytearray(sum(command.serialized_size() for command in commands))
+    offset = 0
+    for command in commands:
+        offset = command.serialize_into(memoryview(buffer), offset)
+    assert offset == len(buffer)
+    assert buffer == b''.join(bytes(command) for command in commands)
+
+
+# -----------------------------------------------------------------------------
+def test_HCI_Command_fixed_layout():
+    assert HCI_Disconnect_Command.fields_struct is not None
+    assert HCI_LE_Set_Advertising_Data_Command.fields_struct is None
+    command = HCI_Packet.from_bytes(bytes.fromhex('0106040300da13'))
+    assert command.connection_handle == 0xDA00
+    assert command.reason == 0x13
+
+    # Address and CodingFormat fields are part of the fixed layout too
+    assert HCI_Enhanced_Accept_Synchronous_Connection_Request_Command.fields_struct
+    coding_format = CodingFormat(CodecID.MSBC)
+    command = HCI_Enhanced_Accept_Synchronous_Connection_Request_Command(
+        bd_addr=Address('00:11:22:33:44:55', Address.PUBLIC_DEVICE_ADDRESS),
+        transmit_bandwidth=8000,
+        receive_bandwidth=8000,
+        transmit_coding_format=coding_format,
+        receive_coding_format=coding_format,
+        transmit_codec_frame_size=60,
+        receive_codec_frame_size=60,
+        input_bandwidth=32000,
+        output_bandwidth=32000,
+        input_coding_format=coding_format,
+        output_coding_format=coding_format,
+        input_coded_data_size=16,
+        output_coded_data_size=16,
+        input_pcm_data_format=2,
+        output_pcm_data_format=2,
+        input_pcm_sample_payload_msb_position=0,
+        output_pcm_sample_payload_msb_position=0,
+        input_data_path=1,
+        output_data_path=1,
+        input_transport_unit_size=0,
+        output_transport_unit_size=0,
+        max_latency=0x000D,
+        packet_type=0x0380,
+        retransmission_effort=2,
+    )
+    basic_check(command)
+    parsed = HCI_Packet.from_bytes(bytes(command))
+    assert parsed.bd_addr == command.bd_addr
+    assert parsed.input_coding_format == coding_format
+
+    # Addresses preceded by their type keep that type
+    assert HCI_LE_Create_Connection_Command.fields_struct is not None
+    command = HCI_LE_Create_Connection_Command(
+        le_scan_interval=4,
+        le_scan_window=5,
+        initiator_filter_policy=0,
+        peer_address_type=1,
+        peer_address=Address('00:11:22:33:44:55'),
+        own_address_type=2,
+        connection_interval_min=7,
+        connection_interval_max=8,
+        max_latency=9,
+        supervision_timeout=10,
+        min_ce_length=11,
+        max_ce_length=12,
+    )
+    parsed = HCI_Packet.from_bytes(bytes(command))
+    assert parsed.peer_address == Address('00:11:22:33:44:55')
+    assert parsed.peer_address.address_type == Address.RANDOM_DEVICE_ADDRESS
+
+
 # -----------------------------------------------------------------------------
 def test_HCI_Set_Event_Mask_Command():
     command = HCI_Set_Event_Mask_Command(event_mask=bytes.fromhex('0011223344556677'))
@@ -287,12 +502,23 @@ def test_HCI_LE_Set_Event_Mask_Command():
     basic_check(command)
 
 
+# -----------------------------------------------------------------------------
+def test_event_mask_rejects_invalid_event_codes():
+    for mask in (HCI_Set_Event_Mask_Command.mask, HCI_LE_Set_Event_Mask_Command.mask):
+        assert mask([1, 64]) == bytes.fromhex('0100000000000080')
+        for event_code in (0, 65):
+            with pytest.raises(ValueError):
+                mask([event_code])
+
+
 # -----------------------------------------------------------------------------
 def test_HCI_LE_Set_Random_Address_Command():
     command = HCI_LE_Set_Random_Address_Command(
         random_address=Address('00:11:22:33:44:55')
     )
     basic_check(command)
+    parsed = HCI_Packet.from_bytes(bytes(command))
+    assert parsed.random_address.address_type == Address.RANDOM_DEVICE_ADDRESS
 
 
 # -----------------------------------------------------------------------------
@@ -316,6 +542,7 @@ def test_HCI_LE_Set_Advertising_Data_Command():
         advertising_data=bytes.fromhex('AABBCC')
     )
     basic_check(command)
+    assert command.parameters == bytes.fromhex('03AABBCC') + bytes(28)
 
 
 # -----------------------------------------------------------------------------
@@ -432,7 +659,23 @@ def test_HCI_LE_Set_Extended_Scan_Parameters_Command():
         scan_intervals=[1, 2, 3],
         scan_windows=[4, 5, 6],
     )
+    assert 'parameters' not in command.__dict__
     basic_check(command)
+    assert command.parameters[:3] == bytes([0x01, 0x01, 0x15])
+
+
+# -----------------------------------------------------------------------------
+def test_HCI_LE_Set_Extended_Advertising_Parameters_Command_flags():
+    properties = (
+        HCI_LE_Set_Extended_Advertising_Parameters_Command.AdvertisingProperties
+    )
+    channel_map = HCI_LE_Set_Extended_Advertising_Parameters_Command.ChannelMap
+    assert (
+        str(properties(0x13))
+        == 'CONNECTABLE_ADVERTISING|SCANNABLE_ADVERTISING|USE_LEGACY_ADVERTISING_PDUS'
+    )
+    assert str(channel_map(0x05)) == 'CHANNEL_37|CHANNEL_39'
+    assert str(channel_map(0)) == ''
 
 
 # -----------------------------------------------------------------------------
@@ -487,6 +730,30 @@ def test_address():
     assert a.is_static
 
 
+# -----------------------------------------------------------------------------
+def test_parsed_address_is_interned():
+    data = bytes.fromhex('00112233445566')
+    _, address1 = Address.parse_address_preceded_by_type(data, 1)
+    _, address2 = Address.parse_address_preceded_by_type(data, 1)
+    assert address1 is address2
+    assert address1 == Address('66:55:44:33:22:11/P')
+    assert not hasattr(address1, '__dict__')
+
+    # Type-less Classic addresses, parsed as part of a fixed-layout command
+    packet = bytes(
+        HCI_IO_Capability_Request_Reply_Command(
+            bd_addr=Address('00:11:22:33:44:55', Address.PUBLIC_DEVICE_ADDRESS),
+            io_capability=1,
+            oob_data_present=0,
+            authentication_requirements=0,
+        )
+    )
+    command1 = HCI_Packet.from_bytes(packet)
+    command2 = HCI_Packet.from_bytes(packet)
+    assert command1.bd_addr is command2.bd_addr
+    assert command1.bd_addr.is_public
+
+
 # -----------------------------------------------------------------------------
 def test_custom():
     data = bytes([0x77, 0x02, 0x01, 0x03])
@@ -521,8 +788,10 @@ def test_iso_data_packet():
 # -----------------------------------------------------------------------------
 def run_test_events():
     test_HCI_Event()
+    test_HCI_Event_serialize_into()
     test_HCI_LE_Connection_Complete_Event()
     test_HCI_LE_Advertising_Report_Event()
+    test_HCI_LE_Extended_Advertising_Report_Event()
     test_HCI_LE_Connection_Update_Complete_Event()
     test_HCI_LE_Read_Remote_Features_Complete_Event()
     test_HCI_LE_Channel_Selection_Algorithm_Event()
@@ -537,11 +806,18 @@ def run_test_commands():
     test_HCI_Reset_Command()
     test_HCI_PIN_Code_Request_Reply_Command()
     test_HCI_Read_Local_Version_Information_Command()
+    test_HCI_Write_Extended_Inquiry_Response_Command()
     test_HCI_Read_Local_Supported_Commands_Command()
+    test_HCI_Read_Local_Supported_Codecs_Command()
     test_HCI_Read_Local_Supported_Features_Command()
     test_HCI_Disconnect_Command()
+    test_subclass_does_not_inherit_fixed_layout()
+    test_serialize_out_of_range_uint8_fields()
+    test_HCI_Command_serialize_into()
+    test_HCI_Command_fixed_layout()
     test_HCI_Set_Event_Mask_Command()
     test_HCI_LE_Set_Event_Mask_Command()
+    test_event_mask_rejects_invalid_event_codes()
     test_HCI_LE_Set_Random_Address_Command()
     test_HCI_LE_Set_Advertising_Parameters_Command()
     test_HCI_LE_Set_Advertising_Data_Command()
@@ -555,6 +831,7 @@ def run_test_commands():
     test_HCI_LE_Read_Remote_Features_Command()
     test_HCI_LE_Set_Default_PHY_Command()
     test_HCI_LE_Set_Extended_Scan_Parameters_Command()
+    test_HCI_LE_Set_Extended_Advertising_Parameters_Command_flags()
     test_HCI_LE_Set_Extended_Advertising_Enable_Command()
     test_HCI_LE_Setup_ISO_Data_Path_Command()
 
@@ -564,5 +841,6 @@ if __name__ == '__main__':
     run_test_events()
     run_test_commands()
     test_address()
+    test_parsed_address_is_interned()
     test_custom()
     test_iso_data_packet()
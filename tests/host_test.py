@@ -60,3 +60,15 @@ async def test_reset(supported_commands: str, lmp_features: str):
     assert host.local_lmp_features == int.from_bytes(
         bytes.fromhex(lmp_features), 'little'
     )
+
+
+# -----------------------------------------------------------------------------
+@pytest.mark.asyncio
+async def test_supported_le_features():
+    controller = Controller('C')
+    host = Host(controller, AsyncPipeSink(controller))
+
+    host.local_le_features = (1 << 0) | (1 << 5) | (1 << 63)
+    assert host.supported_le_features == [0, 5, 63]
+    host.local_le_features = 0
+    assert host.supported_le_features == []
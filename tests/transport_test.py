@@ -50,6 +50,33 @@ def test_parser():
     assert sink1.packets == sink2.packets
 
 
+# -----------------------------------------------------------------------------
+def test_parser_whole_buffer():
+    with open(
+        os.path.join(os.path.dirname(__file__), 'hci_data_001.bin'), 'rb'
+    ) as input:
+        data = input.read()
+
+    sink1 = Sink()
+    parser1 = PacketParser(sink1)
+    for i in range(len(data)):
+        parser1.feed_data(data[i : i + 1])
+
+    # All the packets at once, and with a partial packet at each end
+    sink2 = Sink()
+    parser2 = PacketParser(sink2)
+    parser2.feed_data(data)
+    sink3 = Sink()
+    parser3 = PacketParser(sink3)
+    parser3.feed_data(data[:5])
+    parser3.feed_data(data[5:-3])
+    parser3.feed_data(data[-3:])
+
+    assert sink1.packets
+    assert sink2.packets == sink1.packets
+    assert sink3.packets == sink1.packets
+
+
 # -----------------------------------------------------------------------------
 def test_parser_extensions():
     sink = Sink()
@@ -74,4 +101,5 @@ def test_parser_extensions():
 # -----------------------------------------------------------------------------
 if __name__ == '__main__':
     test_parser()
+    test_parser_whole_buffer()
     test_parser_extensions()